@@ -1,9 +1,21 @@
+import time
+_ARRANQUE = time.perf_counter()
+
 import os
 import sys
 import logging
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, abort, current_app
 from werkzeug.exceptions import HTTPException
 from dotenv import load_dotenv
+
+# Asegurar rutas de importación consistentes en DO App Platform y local (antes de importar
+# models, para que app.py y services/ compartan el mismo models.models y `db`)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
+for p in [BASE_DIR, PROJECT_ROOT]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
 try:
     # when running from backend/ as the app root
     from models.models import db, Producto, Categoria, User, ContactMessage
@@ -13,20 +25,18 @@ except ModuleNotFoundError:
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import text
+import click
+import importlib
 
 # Cargar variables de entorno desde un archivo .env (opcional)
 load_dotenv()
 
 print("🚀 Iniciando aplicación Uparshop - configuración cargada")
 
-# Inicializar la aplicación Flask con rutas dinámicas para assets
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# Asegurar rutas de importación consistentes en DO App Platform y local
-PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
-for p in [BASE_DIR, PROJECT_ROOT]:
-    if p not in sys.path:
-        sys.path.insert(0, p)
+# Tiempos del arranque por fase (ver /__startup)
+from services.startup import StartupProfiler, warmup
+profiler = StartupProfiler(inicio=_ARRANQUE)
+profiler.marcar('imports')
 
 def first_existing(paths, fallback=None, ensure_dir=False):
     for p in paths:
@@ -64,16 +74,20 @@ DB_HOST = os.getenv('DB_HOST') or 'uparshop-bd-do-user-26734553-0.k.db.ondigital
 DB_PORT = os.getenv('DB_PORT') or '25060'
 DB_NAME = os.getenv('DB_NAME') or 'uparshop_bd'
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+from services import db_pool
+
+# DATABASE_URL (opcional) reemplaza la conexión completa, p. ej. sqlite:///local.db para pruebas
+app.config['SQLALCHEMY_DATABASE_URI'] = (
+    os.getenv('DATABASE_URL') or f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+# Pool configurable con DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT y
+# DB_POOL_PRE_PING (always/idle/off); ver services/db_pool.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_pool.engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'],
     # Enable TLS for PyMySQL; empty dict enables SSL without strict verification
-    'connect_args': {
-        'ssl': {}
-    },
-    # Avoid stale connections on DO
-    'pool_pre_ping': True
-}
+    connect_args={'ssl': {}} if app.config['SQLALCHEMY_DATABASE_URI'].startswith('mysql') else None,
+)
 
 # SECRET_KEY: asegurar valor no vacío para habilitar sesiones/flash
 _secret = os.getenv('SECRET_KEY')
@@ -84,35 +98,64 @@ if not _secret or not _secret.strip():
         pass
     _secret = 'uparshop-secret-key-2024-secure-flask-sessions'
 app.config['SECRET_KEY'] = _secret
+app.extensions['startup_profiler'] = profiler
+profiler.marcar('config')
 
 db.init_app(app)
+# Métricas del pool de conexiones por worker (/__pool)
+db_pool.init_app(app, db)
 
-# Registrar blueprints
-try:
-    from controllers.auth_controller import auth_bp
-    app.register_blueprint(auth_bp)
-except Exception as e:
-    app.logger.warning(f"No se pudo registrar controllers.auth: {e}")
+# Latencia, SQL por request, render de plantillas y tamaño de respuesta (/__metrics)
+from services import metrics
+metrics.init_app(app, db)
 
-try:
-    from routes.admin import admin_bp
-    app.register_blueprint(admin_bp)
-except Exception as e:
-    app.logger.warning(f"No se pudo registrar controllers.admin: {e}")
+# Log de consultas lentas y detector de N+1 (QUERY_INSPECTOR=warn en desarrollo)
+from services import query_inspector
+query_inspector.init_app(app, db)
+
+from services.admin_counters import admin_counters
+from services.images import imagen_variante
+from services import jobs
+from services import assets
+from services import carrito, checkout, sessions
+
+# Cola de tareas en segundo plano (procesado de imágenes, etc.)
+jobs.init_app(app)
+
+# CSS/JS versionados por contenido y precomprimidos (helper asset_url en plantillas)
+assets.init_app(app)
+
+# Sesión en cookie (por defecto) o del lado del servidor: SESSION_BACKEND=sqlite|redis
+sessions.init_app(app)
 
-try:
-    from routes.main import main_bp
-    app.register_blueprint(main_bp)
-except Exception as e:
-    app.logger.warning(f"No se pudo registrar routes.main: {e}")
 
-# Crear tablas faltantes (idempotente; solo crea las que no existen)
-with app.app_context():
+@app.template_filter('fecha_unix')
+def fecha_unix(ts):
     try:
-        db.create_all()
-        app.logger.info("Verificación de tablas completada (create_all ejecutado)")
+        return datetime.fromtimestamp(float(ts)).strftime('%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return ''
+
+# Helper de plantillas: variante de imagen (thumb/listado/detalle) de un producto
+app.add_template_global(imagen_variante)
+
+profiler.marcar('extensiones')
+
+# Registrar blueprints
+for _modulo, _nombre in (
+    ('controllers.auth_controller', 'auth_bp'),
+    ('routes.admin', 'admin_bp'),
+    ('routes.main', 'main_bp'),
+):
+    try:
+        with profiler.fase(f'blueprint {_modulo}'):
+            app.register_blueprint(getattr(importlib.import_module(_modulo), _nombre))
     except Exception as e:
-        app.logger.warning(f"No se pudo verificar/crear tablas: {e}")
+        app.logger.exception(f"No se pudo registrar {_modulo}: {e}")
+
+# El esquema ya no se verifica al importar (cada worker hacía create_all contra la BD
+# remota): se gestiona con `flask db-init` / `flask db-migrate` en el despliegue. Los
+# índices en memoria se cargan con `warmup()` (gunicorn, `flask warmup`) o al usarse.
 
 
 # ----------------------
@@ -122,13 +165,8 @@ with app.app_context():
 def inject_admin_counts():
     try:
         if session.get('user_rol') == 'admin':
-            return {
-                'admin_counts': {
-                    'productos': Producto.query.count(),
-                    'usuarios': User.query.count(),
-                    'mensajes': ContactMessage.query.filter_by(leido=False).count()
-                }
-            }
+            # Cacheados por worker (ver services/admin_counters.py)
+            return {'admin_counts': admin_counters.get()}
     except Exception:
         pass
     return {'admin_counts': None}
@@ -137,14 +175,8 @@ def inject_admin_counts():
 @app.context_processor
 def inject_cart_count():
     try:
-        carrito = session.get('carrito', {}) or {}
-        total = 0
-        for v in carrito.values():
-            try:
-                total += int(v)
-            except Exception:
-                pass
-        return {'cart_count': total}
+        # Contador mantenido al escribir el carrito (ver services/carrito.py)
+        return {'cart_count': carrito.contar()}
     except Exception:
         return {'cart_count': 0}
 
@@ -165,14 +197,9 @@ def _handle_exception(e):
 # Helpers
 # ----------------------
 def get_products_by_category_name(category_name):
-    try:
-        cat = Categoria.query.filter(Categoria.nombre.ilike(f"%{category_name}%")).first()
-        if not cat:
-            return []
-        return Producto.query.filter_by(id_categoria=cat.id_categoria).all()
-    except Exception as e:
-        app.logger.error(f"Error consultando productos por categoría '{category_name}': {e}")
-        return []
+    # Delegar en el blueprint main (índice de slugs + cache de catálogo)
+    from routes.main import _get_products_by_category_name
+    return _get_products_by_category_name(category_name)
 
 
 @app.route('/test-db')
@@ -272,8 +299,139 @@ def debug_estructura_tabla():
 ## Rutas duplicadas movidas a blueprint 'main' (ver backend/routes/main.py)
 
 
+# ----------------------
+# Comandos CLI
+# ----------------------
+@app.cli.command('jobs-worker')
+def jobs_worker_command():
+    """Procesa la cola de tareas (equivalente a `python worker.py`)."""
+    jobs.run_worker(app)
+
+
+@app.cli.command('jobs-purge')
+@click.option('--dias', type=float, default=None, help='Antigüedad mínima (por defecto JOBS_RETENTION)')
+def jobs_purge_command(dias):
+    """Elimina las tareas completadas antiguas de la cola."""
+    store = jobs.get_store(app)
+    antiguedad = dias * 86400 if dias is not None else app.config['JOBS_RETENTION']
+    print(f"✅ Tareas completadas eliminadas: {store.purge(antiguedad)}")
+
+
+@app.cli.command('assets-build')
+def assets_build_command():
+    """Versiona y precomprime los assets de static/ (paso de despliegue)."""
+    manifest = assets.build(app.static_folder)
+    print(f"✅ {len(manifest)} assets versionados en {os.path.join(app.static_folder, assets.DIST_DIR)}")
+
+
+@app.cli.command('db-init')
+def db_init_command():
+    """Crea las tablas que falten y aplica los scripts pendientes de backend/db."""
+    from services import schema
+    db.create_all()
+    print("✅ Tablas verificadas (create_all)")
+    aplicadas = schema.aplicar_migraciones(db.engine)
+    print(f"✅ {len(aplicadas)} migraciones aplicadas")
+
+
+@app.cli.command('db-migrate')
+@click.option('--fake', is_flag=True, help='Solo registrar los scripts pendientes como aplicados.')
+def db_migrate_command(fake):
+    """Aplica los scripts .sql pendientes de backend/db (registro en schema_migrations)."""
+    from services import schema
+    pendientes = schema.migraciones_pendientes(db.engine)
+    if not pendientes:
+        print("✅ Sin migraciones pendientes")
+        return
+    schema.aplicar_migraciones(db.engine, fake=fake)
+
+
+@app.cli.command('seed')
+@click.option('--productos', default=100000, show_default=True, help='Productos a generar.')
+@click.option('--usuarios', default=5000, show_default=True, help='Usuarios (clientes) a generar.')
+@click.option('--mensajes', default=20000, show_default=True, help='Mensajes de contacto a generar.')
+@click.option('--semilla', default=42, show_default=True, help='Semilla: la misma semilla genera los mismos datos.')
+@click.option('--lote', default=5000, show_default=True, help='Filas por INSERT/transacción.')
+@click.option('--yes', 'confirmado', is_flag=True, help='Sembrar aunque DATABASE_URL no esté definido.')
+def seed_command(productos, usuarios, mensajes, semilla, lote, confirmado):
+    """Llena la BD con un catálogo sintético para pruebas de escala (no usar en producción)."""
+    from sqlalchemy.engine import make_url
+    from services import seeder
+    destino = make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)
+    print(f"🎯 BD destino: {destino}")
+    # Sin DATABASE_URL la app apunta a la BD de producción (credenciales DB_*)
+    if not os.getenv('DATABASE_URL') and not confirmado:
+        raise click.ClickException(
+            'DATABASE_URL no está definido: se sembraría la BD configurada por DB_*. '
+            'Define DATABASE_URL (p. ej. sqlite:///seed.db) o confirma con --yes.'
+        )
+    db.create_all()
+    resumen = seeder.sembrar(db, productos=productos, usuarios=usuarios, mensajes=mensajes,
+                             semilla=semilla, lote=lote, log=print)
+    seeder.recargar_indices()
+    print(f"✅ Datos sintéticos insertados: {resumen}")
+
+
+@app.cli.command('productos-importar')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Por defecto según la extensión.')
+@click.option('--lote', default=1000, show_default=True, help='Filas por INSERT/UPDATE masivo.')
+@click.option('--simular', is_flag=True, help='Solo validar, sin escribir.')
+def productos_importar_command(archivo, formato, lote, simular):
+    """Importa productos desde CSV/JSONL (crea o actualiza por id_producto o nombre)."""
+    from services import productos_io
+    formato = formato or ('csv' if archivo.lower().endswith('.csv') else 'jsonl')
+    with open(archivo, 'rb') as fh:
+        resumen = productos_io.importar_productos(productos_io.leer_filas(fh, formato), lote=lote, simular=simular)
+    for error in resumen.pop('detalle_errores'):
+        print(f"❌ Línea {error['linea']}: {error['error']}")
+    print(f"✅ Importación terminada: {resumen}")
+    print("ℹ️  Los workers web ven los cambios al vencer sus caches e índices (TTL)")
+
+
+@app.cli.command('productos-exportar')
+@click.argument('archivo', type=click.Path(dir_okay=False, writable=True))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Por defecto según la extensión.')
+def productos_exportar_command(archivo, formato):
+    """Exporta la tabla de productos completa a CSV/JSONL en streaming."""
+    from services import productos_io
+    formato = formato or ('csv' if archivo.lower().endswith('.csv') else 'jsonl')
+    with open(archivo, 'w', encoding='utf-8', newline='') as fh:
+        for chunk in productos_io.exportar_productos(formato):
+            fh.write(chunk)
+    print(f"✅ Productos exportados a {archivo}")
+
+
+@app.cli.command('sessions-purge')
+def sessions_purge_command():
+    """Elimina en bloque las sesiones vencidas del store del servidor."""
+    store = app.extensions.get('session_store')
+    if store is None:
+        print("ℹ️  SESSION_BACKEND=cookie: no hay sesiones en el servidor")
+        return
+    print(f"✅ Sesiones vencidas eliminadas: {store.purge_expired()} (quedan {store.count()})")
+
+
+@app.cli.command('checkout-expirar')
+@click.option('--limite', default=500, show_default=True, help='Máximo de reservas a liberar')
+def checkout_expirar_command(limite):
+    """Devuelve al catálogo el stock de las reservas vencidas."""
+    print(f"✅ Reservas vencidas liberadas: {checkout.liberar_vencidas(limite)}")
+
+
+@app.cli.command('warmup')
+def warmup_command():
+    """Compila plantillas y carga los índices en memoria, mostrando los tiempos."""
+    print(warmup(app))
+    print(profiler.report())
+
+
+profiler.marcar('rutas')
+profiler.log(app.logger)
+
 # Permite ejecutar la aplicación directamente
 if __name__ == "__main__":
+    warmup(app)
     port = int(os.environ.get("PORT", 5000))
     print(f"✅ Aplicación Uparshop iniciando en puerto {port}")
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -286,6 +444,37 @@ print("✅ Módulo app.py cargado correctamente - Listo para gunicorn")
 def __ping():
     return 'pong'
 
+@app.route('/__metrics')
+def __metrics():
+    return metrics.metrics_response()
+
+@app.route('/__cache_stats')
+def __cache_stats():
+    from services.catalog_cache import catalog_cache
+    from services.category_index import category_index
+    from services.search import get_search_backend
+    from services.page_cache import page_cache
+    from services.autocomplete import productos_autocomplete, usuarios_autocomplete
+    return jsonify({
+        'catalog': catalog_cache.stats(),
+        'pages': page_cache.stats(),
+        'categories': category_index.stats(),
+        'search': get_search_backend().stats(),
+        'autocomplete': {
+            'productos': productos_autocomplete.stats(),
+            'usuarios': usuarios_autocomplete.stats(),
+        },
+    })
+
+@app.route('/__pool')
+def __pool():
+    return jsonify(db_pool.pool_status(app))
+
+@app.route('/__startup')
+def __startup():
+    from services.startup import startup_report
+    return jsonify(startup_report())
+
 @app.route('/__routes')
 def __routes():
     try:
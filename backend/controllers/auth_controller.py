@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from werkzeug.security import check_password_hash
 from models.models import User, db
+from services.admin_counters import admin_counters
+from services.sessions import regenerar_id
+from services.autocomplete import usuarios_autocomplete, usuario_autocomplete_doc
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -22,6 +25,7 @@ def login():
                 return redirect(url_for('auth.login'))
             # Soportar contraseñas en texto plano y con hash de werkzeug
             if user.contrasena == password or check_password_hash(str(user.contrasena), password):
+                regenerar_id(session)
                 session['user_id'] = user.id_usuario
                 session['user_email'] = user.correo
                 session['user_rol'] = user.rol
@@ -73,5 +77,7 @@ def crear_cuenta():
     )
     db.session.add(nuevo_usuario)
     db.session.commit()
+    admin_counters.adjust('usuarios', 1)
+    usuarios_autocomplete.upsert(*usuario_autocomplete_doc(nuevo_usuario))
     flash('Cuenta creada exitosamente. Ahora puedes iniciar sesión.', 'success')
     return redirect(url_for('auth.login'))
@@ -0,0 +1,16 @@
+-- Columna de última modificación de productos (ETag / Last-Modified del catálogo)
+-- Ejecuta este script en tu base de datos antes de desplegar esta versión
+-- La aplicación escribe la fecha en UTC; las filas existentes se marcan con la hora actual
+-- Un ALTER por columna y por índice: si uno ya existe (1060/1061, p. ej. tras
+-- create_all) `flask db-migrate` lo omite sin saltarse los demás
+
+USE `uparshop_bd`;
+
+ALTER TABLE `productos` ADD COLUMN `actualizado_at` datetime NULL;
+
+-- Solo las filas sin fecha: volver a ejecutar el script no reescribe las existentes
+UPDATE `productos` SET `actualizado_at` = UTC_TIMESTAMP() WHERE `actualizado_at` IS NULL;
+
+ALTER TABLE `productos` MODIFY `actualizado_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+ALTER TABLE `productos` ADD INDEX `ix_productos_categoria_actualizado` (`id_categoria`, `actualizado_at`);
@@ -0,0 +1,8 @@
+-- Índices FULLTEXT para la búsqueda de productos (SEARCH_BACKEND=fulltext)
+-- Ejecuta este script en tu base de datos antes de activar el backend 'fulltext'
+-- (InnoDB solo admite crear un índice FULLTEXT por sentencia)
+
+USE `uparshop_bd`;
+
+ALTER TABLE `productos` ADD FULLTEXT INDEX `ft_productos_nombre` (`nombre`);
+ALTER TABLE `productos` ADD FULLTEXT INDEX `ft_productos_nombre_descripcion` (`nombre`, `descripcion_detallada`);
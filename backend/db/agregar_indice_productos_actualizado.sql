@@ -0,0 +1,8 @@
+-- Índice (id_categoria, actualizado_at) de productos
+-- Las BD donde agregar_actualizado_at_productos.sql quedó registrado tras un 1060
+-- (columna ya creada por create_all) nunca recibieron el índice; si ya existe (1061)
+-- `flask db-migrate` lo omite
+
+USE `uparshop_bd`;
+
+ALTER TABLE `productos` ADD INDEX `ix_productos_categoria_actualizado` (`id_categoria`, `actualizado_at`);
@@ -0,0 +1,8 @@
+-- Índices para la paginación por cursor del panel admin (/admin/mensajes)
+-- Ejecuta este script en tu base de datos; productos y usuarios se recorren por su PRIMARY KEY
+
+USE `uparshop_bd`;
+
+ALTER TABLE `contact_messages`
+  ADD INDEX `ix_contact_messages_creado` (`creado_at`, `id`),
+  ADD INDEX `ix_contact_messages_leido_creado` (`leido`, `creado_at`, `id`);
@@ -0,0 +1,32 @@
+-- Tablas del checkout: pedidos con reserva de stock y sus líneas
+-- Ejecuta este script en tu base de datos (o `flask --app app db-migrate`)
+
+USE `uparshop_bd`;
+
+CREATE TABLE IF NOT EXISTS `pedidos` (
+  `id_pedido` INT NOT NULL AUTO_INCREMENT,
+  `id_usuario` INT NULL,
+  `correo` VARCHAR(100) NULL,
+  `estado` VARCHAR(20) NOT NULL DEFAULT 'reservado',
+  `total` DECIMAL(12,2) NOT NULL DEFAULT 0,
+  `creado_at` DATETIME NULL,
+  `expira_at` DATETIME NOT NULL,
+  `confirmado_at` DATETIME NULL,
+  PRIMARY KEY (`id_pedido`),
+  KEY `ix_pedidos_estado_expira` (`estado`, `expira_at`),
+  KEY `ix_pedidos_usuario` (`id_usuario`, `creado_at`),
+  CONSTRAINT `fk_pedidos_usuario` FOREIGN KEY (`id_usuario`) REFERENCES `usuarios` (`id_usuario`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `pedido_lineas` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `id_pedido` INT NOT NULL,
+  `id_producto` INT NOT NULL,
+  `nombre` VARCHAR(255) NULL,
+  `cantidad` INT NOT NULL,
+  `precio_unitario` DECIMAL(10,2) NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `ix_pedido_lineas_id_pedido` (`id_pedido`),
+  CONSTRAINT `fk_pedido_lineas_pedido` FOREIGN KEY (`id_pedido`) REFERENCES `pedidos` (`id_pedido`),
+  CONSTRAINT `fk_pedido_lineas_producto` FOREIGN KEY (`id_producto`) REFERENCES `productos` (`id_producto`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
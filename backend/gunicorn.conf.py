@@ -0,0 +1,79 @@
+"""Configuración de gunicorn para producción (`gunicorn -c gunicorn.conf.py app:app`).
+
+Variables de entorno:
+    PORT                  puerto (8000)
+    WEB_CONCURRENCY       procesos worker (núcleos + 1)
+    GUNICORN_THREADS      hilos por worker (4; con más de 1 se usa el worker gthread)
+    GUNICORN_TIMEOUT      segundos antes de reiniciar un worker bloqueado (60)
+    GUNICORN_PRELOAD      '0' para cargar la app en cada worker en vez de en el master
+    WARMUP_PATHS          URLs que se renderizan al arrancar, separadas por comas ('/')
+"""
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Cada worker atiende varios requests a la vez con hilos: la mayor parte del tiempo
+# de un request se espera a la BD remota, así que basta con un proceso por núcleo (+1)
+workers = int(os.getenv('WEB_CONCURRENCY') or multiprocessing.cpu_count() + 1)
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# La app (y el warmup) se cargan una vez en el master y los workers la heredan
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers de a poco evita que crezcan sin límite
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+WARMUP_PATHS = [p.strip() for p in os.getenv('WARMUP_PATHS', '/').split(',') if p.strip()]
+
+
+def _flask_app(server):
+    return server.app.wsgi()
+
+
+def _dispose_engine(app, close):
+    from models.models import db
+    with app.app_context():
+        db.engine.dispose(close=close)
+
+
+def when_ready(server):
+    """Con preload: precalienta en el master antes de crear los workers."""
+    if not preload_app:
+        return
+    app = _flask_app(server)
+    from services.startup import warmup
+    server.log.info(f"Warmup: {warmup(app, WARMUP_PATHS)}")
+    # Las conexiones abiertas por el warmup no deben heredarse: se cierran aquí
+    _dispose_engine(app, close=True)
+
+
+def post_fork(server, worker):
+    """Cada worker empieza con un pool vacío (las conexiones no se comparten entre procesos)."""
+    if 'app' not in sys.modules:
+        return
+    app = _flask_app(server)
+    # close=False: no cerrar sockets que, por si acaso, aún use el master
+    _dispose_engine(app, close=False)
+    from services.db_pool import pool_stats
+    from services.metrics import registry
+    pool_stats.reset()
+    # Las métricas del warmup en el master no son tráfico de este worker
+    registry.reset()
+
+
+def post_worker_init(worker):
+    """Sin preload cada worker carga la app por su cuenta: precalentar antes de aceptar tráfico."""
+    if preload_app:
+        return
+    from services.startup import warmup
+    warmup(worker.wsgi, WARMUP_PATHS)
@@ -5,6 +5,20 @@ import datetime
 db = SQLAlchemy()
 
 
+PLACEHOLDER_IMAGEN_URL = '/static/images/product-placeholder.svg'
+
+
+def imagen_web_url(imagen_url) -> str:
+    """Normaliza un valor de imagen_url a una URL servible (ver Producto.web_imagen_url)."""
+    u = (imagen_url or '').strip()
+    if not u:
+        return PLACEHOLDER_IMAGEN_URL
+    low = u.lower()
+    if low.startswith('http://') or low.startswith('https://') or u.startswith('/'):
+        return u
+    return f"/static/productos/{u}"
+
+
 class Categoria(db.Model):
     __tablename__ = 'categorias'
     id_categoria = db.Column(db.Integer, primary_key=True)
@@ -30,7 +44,13 @@ class Producto(db.Model):
     estado = db.Column(db.String(20), default='activo')
     garantia_fecha = db.Column(db.Date)
     unidad = db.Column(db.String(50), default='unidad')
+    # UTC; valida las respuestas condicionales (ETag / Last-Modified) del catálogo
+    actualizado_at = db.Column(db.DateTime, default=datetime.datetime.utcnow,
+                               onupdate=datetime.datetime.utcnow)
     categoria = db.relationship('Categoria', backref='productos')
+    __table_args__ = (
+        db.Index('ix_productos_categoria_actualizado', 'id_categoria', 'actualizado_at'),
+    )
 
     def __repr__(self):
         return f"<Producto {self.nombre}>"
@@ -51,13 +71,13 @@ class Producto(db.Model):
         - Si es un nombre de archivo simple, se sirve desde /static/productos/<archivo>.
         - Si no hay imagen, retorna el placeholder por defecto.
         """
-        u = (self.imagen_url or '').strip()
-        if not u:
-            return '/static/images/product-placeholder.svg'
-        low = u.lower()
-        if low.startswith('http://') or low.startswith('https://') or u.startswith('/'):
-            return u
-        return f"/static/productos/{u}"
+        return imagen_web_url(self.imagen_url)
+
+    @property
+    def imagen_thumb(self):
+        """URL de la miniatura generada al subir la imagen, o None si no existe."""
+        from services.images import variante_url  # import diferido: services depende de models
+        return variante_url(self.imagen_url, 'thumb')
 
 
 class User(db.Model):
@@ -109,6 +129,47 @@ class ContactMessage(db.Model):
     mensaje = db.Column(db.Text)
     creado_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     leido = db.Column(db.Boolean, default=False)
+    # Paginación por cursor (creado_at, id) del listado admin, con y sin filtro de estado
+    __table_args__ = (
+        db.Index('ix_contact_messages_creado', 'creado_at', 'id'),
+        db.Index('ix_contact_messages_leido_creado', 'leido', 'creado_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<ContactMessage {self.id} {self.correo}>"
+
+
+class Pedido(db.Model):
+    """Pedido del checkout: 'reservado' descuenta stock hasta `expira_at`; luego se
+    confirma, se cancela o vence (el stock vuelve al catálogo)."""
+    __tablename__ = 'pedidos'
+    id_pedido = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'))
+    correo = db.Column(db.String(100))
+    estado = db.Column(db.String(20), nullable=False, default='reservado')
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    creado_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    expira_at = db.Column(db.DateTime, nullable=False)
+    confirmado_at = db.Column(db.DateTime)
+    lineas = db.relationship('PedidoLinea', backref='pedido', lazy='selectin')
+    # Barrido de reservas vencidas y "mis pedidos"
+    __table_args__ = (
+        db.Index('ix_pedidos_estado_expira', 'estado', 'expira_at'),
+        db.Index('ix_pedidos_usuario', 'id_usuario', 'creado_at'),
+    )
+
+    def __repr__(self):
+        return f"<Pedido {self.id_pedido} {self.estado}>"
+
+
+class PedidoLinea(db.Model):
+    __tablename__ = 'pedido_lineas'
+    id = db.Column(db.Integer, primary_key=True)
+    id_pedido = db.Column(db.Integer, db.ForeignKey('pedidos.id_pedido'), nullable=False, index=True)
+    id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), nullable=False)
+    nombre = db.Column(db.String(255))
+    cantidad = db.Column(db.Integer, nullable=False)
+    precio_unitario = db.Column(db.Numeric(10, 2), nullable=False)
 
     def __repr__(self):
-        return f"<ContactMessage {self.id} {self.correo}>"
\ No newline at end of file
+        return f"<PedidoLinea {self.id_pedido} {self.id_producto} x{self.cantidad}>"
@@ -5,10 +5,75 @@ import os
 from datetime import datetime, timedelta
 from models.models import db, Producto, Categoria, User, ContactMessage
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from services.catalog_cache import catalog_cache
+from services.page_cache import page_cache
+from services.search import get_search_backend
+from services.admin_counters import admin_counters
+from services.keyset import KeysetPage, clamp_per_page, paginate_keyset
+from services.autocomplete import (
+    productos_autocomplete, usuarios_autocomplete, producto_autocomplete_doc, usuario_autocomplete_doc
+)
+from services.images import eliminar_variantes
+from services import exportacion, productos_io
+from services.productos_io import normalizar_unidad
+from services import jobs
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 
+def _catalogo_modificado(producto=None, eliminado_id=None):
+    """Propaga una escritura del catálogo a las caches e índices del proceso."""
+    catalog_cache.invalidate()
+    page_cache.clear()
+    try:
+        search = get_search_backend()
+        if producto is not None:
+            search.index_product(producto)
+            productos_autocomplete.upsert(*producto_autocomplete_doc(producto))
+        if eliminado_id is not None:
+            search.remove_product(eliminado_id)
+            productos_autocomplete.remove(eliminado_id)
+    except Exception as e:
+        current_app.logger.warning(f"No se pudo actualizar el índice de búsqueda: {e}")
+
+
+def _total_si_se_pide(query):
+    """COUNT(*) del listado filtrado solo si se pidió con ?contar=1 (None si no)."""
+    if request.args.get('contar') == '1':
+        return query.order_by(None).count()
+    return None
+
+
+def _guardar_imagen_subida(imagen_file):
+    """Guarda la imagen bajo static/productos con nombre único y encola sus variantes.
+
+    Devuelve la imagen_url a guardar en el producto.
+    """
+    from werkzeug.utils import secure_filename
+    # Guardar SIEMPRE bajo el static_folder real de Flask
+    productos_dir = os.path.join(current_app.static_folder, 'productos')
+    if not os.path.exists(productos_dir):
+        os.makedirs(productos_dir)
+    filename = secure_filename(imagen_file.filename)
+    base, ext = os.path.splitext(filename)
+    i = 1
+    save_path = os.path.join(productos_dir, filename)
+    while os.path.exists(save_path):
+        filename = f"{base}_{i}{ext}"
+        save_path = os.path.join(productos_dir, filename)
+        i += 1
+    imagen_file.save(save_path)
+    imagen_url = f"/static/productos/{filename}"
+    try:
+        # El redimensionado corre fuera del request (ver services/jobs.py)
+        jobs.enqueue('procesar_imagen', {'imagen_url': imagen_url})
+    except Exception as e:
+        # Sin variantes las plantillas usan la imagen original
+        current_app.logger.warning(f"No se pudieron encolar las variantes de {imagen_url}: {e}")
+    return imagen_url
+
+
 @admin_bp.route('/')
 def admin_index():
     if not session.get('user_rol') == 'admin':
@@ -17,18 +82,15 @@ def admin_index():
     return render_template('admin.html')
 
 
-@admin_bp.route('/mensajes')
-def admin_mensajes():
-    if not session.get('user_rol') == 'admin':
-        flash('Acceso restringido solo para administradores.', 'error')
-        return redirect(url_for('main.home'))
+def _filtrar_mensajes(args):
+    """Consulta de ContactMessage con los filtros del listado (q, estado, fecha_desde, fecha_hasta).
 
-    q = request.args.get('q', '').strip()
-    estado = request.args.get('estado', '').strip()
-    fecha_desde = request.args.get('fecha_desde', '').strip()
-    fecha_hasta = request.args.get('fecha_hasta', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    Devuelve (query, filtros); la comparten el listado y la exportación.
+    """
+    q = args.get('q', '').strip()
+    estado = args.get('estado', '').strip()
+    fecha_desde = args.get('fecha_desde', '').strip()
+    fecha_hasta = args.get('fecha_hasta', '').strip()
 
     query = ContactMessage.query
     if q:
@@ -55,22 +117,66 @@ def admin_mensajes():
         query = query.filter(ContactMessage.creado_at >= dt_desde)
     if dt_hasta:
         query = query.filter(ContactMessage.creado_at < (dt_hasta + timedelta(days=1)))
+    return query, {'q': q, 'estado': estado, 'fecha_desde': fecha_desde, 'fecha_hasta': fecha_hasta}
+
+
+@admin_bp.route('/mensajes')
+def admin_mensajes():
+    if not session.get('user_rol') == 'admin':
+        flash('Acceso restringido solo para administradores.', 'error')
+        return redirect(url_for('main.home'))
 
+    cursor = request.args.get('cursor', '').strip()
+    per_page = clamp_per_page(request.args.get('per_page'))
+    query, filtros = _filtrar_mensajes(request.args)
+    q, estado = filtros['q'], filtros['estado']
+    fecha_desde, fecha_hasta = filtros['fecha_desde'], filtros['fecha_hasta']
+    filtros['per_page'] = per_page
     try:
-        pagination = query.order_by(ContactMessage.creado_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        mensajes = pagination.items
-        total = pagination.total
+        if estado == 'noleidos' and not (q or fecha_desde or fecha_hasta):
+            total = admin_counters.get()['mensajes']
+        else:
+            total = _total_si_se_pide(query)
+        pagina = paginate_keyset(
+            query, (ContactMessage.creado_at, ContactMessage.id),
+            cursor=cursor, per_page=per_page, total=total
+        )
     except Exception as e:
         current_app.logger.error(f"Error al listar mensajes de contacto: {e}")
-        mensajes = query.order_by(ContactMessage.creado_at.desc()).all()
-        total = len(mensajes)
-        pagination = None
+        flash('No se pudieron cargar los mensajes.', 'error')
+        pagina = KeysetPage([], None, None)
     return render_template(
-        'admin_mensajes.html', mensajes=mensajes, pagination=pagination, total=total,
+        'admin_mensajes.html', mensajes=pagina.items, pagina=pagina, total=pagina.total, filtros=filtros,
         q=q, estado=estado, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, per_page=per_page
     )
 
 
+COLUMNAS_MENSAJES = (
+    ContactMessage.id, ContactMessage.creado_at, ContactMessage.nombre, ContactMessage.correo,
+    ContactMessage.asunto, ContactMessage.mensaje, ContactMessage.leido,
+)
+
+
+@admin_bp.route('/mensajes/exportar')
+def exportar_mensajes():
+    """Descarga los mensajes (con los filtros del listado) en CSV o JSONL, en streaming."""
+    if not session.get('user_rol') == 'admin':
+        flash('Acceso restringido solo para administradores.', 'error')
+        return redirect(url_for('main.home'))
+    formato = request.args.get('formato', 'csv').strip().lower()
+    if formato not in exportacion.FORMATOS:
+        formato = 'csv'
+    query, _ = _filtrar_mensajes(request.args)
+    query = query.with_entities(*COLUMNAS_MENSAJES).order_by(
+        ContactMessage.creado_at.desc(), ContactMessage.id.desc()
+    )
+    columnas = [c.key for c in COLUMNAS_MENSAJES]
+    return exportacion.descarga(
+        exportacion.serializar(exportacion.filas_en_streaming(query), columnas, formato),
+        formato, 'mensajes'
+    )
+
+
 @admin_bp.route('/mensajes/marcar', methods=['POST'])
 def admin_mensajes_marcar():
     if not session.get('user_rol') == 'admin':
@@ -93,11 +199,14 @@ def admin_mensajes_marcar():
                 return jsonify({'ok': False, 'error': 'Mensaje no encontrado'}), 404
             flash('Mensaje no encontrado.', 'error')
             return redirect(url_for('admin.admin_mensajes'))
+        leido_antes = bool(msg.leido)
         if mark == 'read':
             msg.leido = True
         elif mark == 'unread':
             msg.leido = False
         db.session.commit()
+        if bool(msg.leido) != leido_antes:
+            admin_counters.adjust('mensajes', -1 if msg.leido else 1)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.headers.get('Accept','').startswith('application/json'):
             return jsonify({'ok': True})
         flash('Mensaje actualizado.', 'success')
@@ -110,6 +219,64 @@ def admin_mensajes_marcar():
         return redirect(url_for('admin.admin_mensajes'))
 
 
+MAX_IDS_LOTE = 1000
+
+
+@admin_bp.route('/mensajes/marcar-lote', methods=['POST'])
+def admin_mensajes_marcar_lote():
+    """Marca varios mensajes como leídos/no leídos con un solo UPDATE.
+
+    Recibe `ids` (lista, hasta MAX_IDS_LOTE) o `filtros` (los del listado: q, estado,
+    fecha_desde, fecha_hasta) y `mark` = read | unread. Devuelve cuántos cambiaron y
+    el total de no leídos para el badge.
+    """
+    quiere_json = request.is_json or request.headers.get('Accept', '').startswith('application/json')
+
+    def responder(payload, status=200):
+        if quiere_json:
+            return jsonify(payload), status
+        if payload.get('ok'):
+            flash(f"{payload['actualizados']} mensajes actualizados.", 'success')
+        else:
+            flash(payload.get('error', 'Error al actualizar mensajes.'), 'error')
+        return redirect(url_for('admin.admin_mensajes'))
+
+    if not session.get('user_rol') == 'admin':
+        return responder({'ok': False, 'error': 'Acceso denegado'}, 403)
+    datos = request.get_json(silent=True) or {}
+    mark = datos.get('mark') or request.form.get('mark') or 'read'
+    if mark not in ('read', 'unread'):
+        return responder({'ok': False, 'error': 'mark debe ser read o unread'}, 400)
+    leer = mark == 'read'
+    ids = datos.get('ids') if request.is_json else request.form.getlist('ids')
+    filtros = datos.get('filtros') if request.is_json else None
+    try:
+        if ids:
+            ids = {int(i) for i in ids}
+            if len(ids) > MAX_IDS_LOTE:
+                return responder({'ok': False, 'error': f'Máximo {MAX_IDS_LOTE} ids por lote'}, 400)
+            query = ContactMessage.query.filter(ContactMessage.id.in_(ids))
+        elif isinstance(filtros, dict):
+            query, _ = _filtrar_mensajes({k: str(v) for k, v in filtros.items() if v is not None})
+        else:
+            return responder({'ok': False, 'error': 'Indica ids o filtros'}, 400)
+    except (TypeError, ValueError):
+        return responder({'ok': False, 'error': 'ids inválidos'}, 400)
+    try:
+        # Solo las filas que cambian de estado: el rowcount es el ajuste exacto del contador
+        actualizados = query.filter(ContactMessage.leido.is_(not leer)).update(
+            {ContactMessage.leido: leer}, synchronize_session=False
+        )
+        db.session.commit()
+        if actualizados:
+            admin_counters.adjust('mensajes', -actualizados if leer else actualizados)
+        return responder({'ok': True, 'actualizados': actualizados, 'no_leidos': admin_counters.get()['mensajes']})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error al marcar mensajes en lote: {e}")
+        return responder({'ok': False, 'error': 'Error interno'}, 500)
+
+
 @admin_bp.route('/mensajes/<int:message_id>/json')
 def admin_mensaje_json(message_id):
     if not session.get('user_rol') == 'admin':
@@ -134,24 +301,28 @@ def admin_usuario():
         return redirect(url_for('main.home'))
 
     q = request.args.get('q', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor', '').strip()
+    per_page = clamp_per_page(request.args.get('per_page'))
 
     query = User.query
     if q:
         query = query.filter((User.nombre_completo.ilike(f"%{q}%")) | (User.correo.ilike(f"%{q}%")))
 
+    filtros = {'q': q, 'per_page': per_page}
     try:
-        pagination = query.order_by(User.id_usuario.asc()).paginate(page=page, per_page=per_page, error_out=False)
-        usuarios = pagination.items
-        total = pagination.total
+        total = admin_counters.get()['usuarios'] if not q else _total_si_se_pide(query)
+        pagina = paginate_keyset(
+            query, (User.id_usuario,), cursor=cursor, per_page=per_page, descending=False, total=total
+        )
     except Exception as e:
         current_app.logger.error(f"Error al listar usuarios en admin: {e}")
-        usuarios = query.order_by(User.id_usuario.asc()).all()
-        total = len(usuarios)
-        pagination = None
+        flash('No se pudieron cargar los usuarios.', 'error')
+        pagina = KeysetPage([], None, None)
 
-    return render_template('admin_usuario.html', usuarios=usuarios, q=q, pagination=pagination, total=total, per_page=per_page)
+    return render_template(
+        'admin_usuario.html', usuarios=pagina.items, q=q, pagina=pagina, total=pagina.total,
+        filtros=filtros, per_page=per_page
+    )
 
 
 @admin_bp.route('/usuarios/cambiar-rol', methods=['POST'])
@@ -222,6 +393,7 @@ def editar_usuario(usuario_id):
     usuario.direccion = direccion
     usuario.telefono_contacto = telefono_contacto
     db.session.commit()
+    usuarios_autocomplete.upsert(*usuario_autocomplete_doc(usuario))
     flash('Usuario actualizado correctamente.', 'success')
     return redirect(url_for('admin.admin_usuario'))
 
@@ -237,8 +409,17 @@ def eliminar_usuario():
         return redirect(url_for('admin.admin_usuario'))
     usuario = User.query.get(int(usuario_id))
     if usuario and usuario.id_usuario != 1:
-        db.session.delete(usuario)
-        db.session.commit()
+        eliminado_id = usuario.id_usuario
+        try:
+            db.session.delete(usuario)
+            db.session.commit()
+        except IntegrityError:
+            # Sus pedidos lo referencian (FK sin cascada)
+            db.session.rollback()
+            flash('No se puede eliminar el usuario: tiene pedidos asociados.', 'error')
+            return redirect(url_for('admin.admin_usuario'))
+        usuarios_autocomplete.remove(eliminado_id)
+        admin_counters.adjust('usuarios', -1)
         flash('Usuario eliminado correctamente.', 'success')
     else:
         flash('No se puede eliminar el usuario seleccionado.', 'error')
@@ -255,8 +436,8 @@ def admin_productos():
     id_categoria = request.args.get('id_categoria', '').strip()
     min_price = request.args.get('min_price', '').strip()
     max_price = request.args.get('max_price', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor', '').strip()
+    per_page = clamp_per_page(request.args.get('per_page'))
 
     query = Producto.query
     if q:
@@ -277,22 +458,24 @@ def admin_productos():
         except Exception:
             pass
 
+    filtros = {'q': q, 'id_categoria': id_categoria, 'min_price': min_price, 'max_price': max_price, 'per_page': per_page}
     try:
-        pagination = query.order_by(Producto.id_producto.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        productos = pagination.items
-        total = pagination.total
+        if not (q or id_categoria or min_price or max_price):
+            total = admin_counters.get()['productos']
+        else:
+            total = _total_si_se_pide(query)
+        pagina = paginate_keyset(query, (Producto.id_producto,), cursor=cursor, per_page=per_page, total=total)
     except Exception as e:
         current_app.logger.error(f"Error al listar productos en admin: {e}")
-        productos = query.order_by(Producto.id_producto.desc()).all()
-        total = len(productos)
-        pagination = None
+        flash('No se pudieron cargar los productos.', 'error')
+        pagina = KeysetPage([], None, None)
 
     categorias = Categoria.query.all()
 
     return render_template(
-        'admin_productos.html', productos=productos, q=q,
+        'admin_productos.html', productos=pagina.items, q=q,
         id_categoria=id_categoria, min_price=min_price, max_price=max_price,
-        pagination=pagination, total=total, categorias=categorias, per_page=per_page
+        pagina=pagina, total=pagina.total, filtros=filtros, categorias=categorias, per_page=per_page
     )
 
 
@@ -304,6 +487,10 @@ def autocomplete_admin_productos():
     if not q:
         return jsonify([])
     try:
+        # Índice en memoria; SQL solo mientras se carga
+        suggestions = productos_autocomplete.search(q)
+        if suggestions is not None:
+            return jsonify(suggestions)
         results = Producto.query.filter(Producto.nombre.ilike(f"%{q}%")).limit(10).all()
         suggestions = [{'id': p.id_producto, 'nombre': p.nombre} for p in results]
         return jsonify(suggestions)
@@ -312,6 +499,64 @@ def autocomplete_admin_productos():
         return jsonify([])
 
 
+def _formato_archivo(nombre_archivo, formato=None):
+    formato = (formato or '').strip().lower()
+    if not formato:
+        extension = os.path.splitext(nombre_archivo or '')[1].lower().lstrip('.')
+        formato = 'jsonl' if extension in ('jsonl', 'ndjson') else extension
+    return formato if formato in exportacion.FORMATOS else None
+
+
+@admin_bp.route('/productos/importar', methods=['POST'])
+def importar_productos():
+    """Importa un CSV/JSONL de productos (crea o actualiza por id_producto o nombre)."""
+    if not session.get('user_rol') == 'admin':
+        flash('Acceso restringido solo para administradores.', 'error')
+        return redirect(url_for('main.home'))
+    quiere_json = request.accept_mimetypes.best == 'application/json'
+    archivo = request.files.get('archivo')
+    formato = _formato_archivo(archivo.filename if archivo else None, request.form.get('formato'))
+    if not archivo or not archivo.filename or formato is None:
+        mensaje = 'Sube un archivo .csv o .jsonl.'
+        if quiere_json:
+            return jsonify({'error': mensaje}), 400
+        flash(mensaje, 'error')
+        return redirect(url_for('admin.admin_productos'))
+    try:
+        resumen = productos_io.importar_productos(
+            productos_io.leer_filas(archivo.stream, formato),
+            simular=request.form.get('simular') == '1'
+        )
+        if resumen['insertados'] or resumen['actualizados']:
+            productos_io.catalogo_importado()
+        current_app.logger.info(f"Importación de productos ({archivo.filename}): {resumen}")
+    except Exception as e:
+        current_app.logger.error(f"Error en importar_productos: {e}")
+        if quiere_json:
+            return jsonify({'error': str(e)}), 400
+        flash(f'Error al importar productos: {str(e)}', 'error')
+        return redirect(url_for('admin.admin_productos'))
+    if quiere_json:
+        return jsonify(resumen)
+    flash(f"Importación: {resumen['insertados']} nuevos, {resumen['actualizados']} actualizados, "
+          f"{resumen['errores']} filas con error.", 'success' if not resumen['errores'] else 'info')
+    for error in resumen['detalle_errores'][:5]:
+        flash(f"Línea {error['linea']}: {error['error']}", 'error')
+    return redirect(url_for('admin.admin_productos'))
+
+
+@admin_bp.route('/productos/exportar')
+def exportar_productos():
+    """Descarga el catálogo completo en CSV o JSONL, generado en streaming."""
+    if not session.get('user_rol') == 'admin':
+        flash('Acceso restringido solo para administradores.', 'error')
+        return redirect(url_for('main.home'))
+    formato = request.args.get('formato', 'csv').strip().lower()
+    if formato not in exportacion.FORMATOS:
+        formato = 'csv'
+    return exportacion.descarga(productos_io.exportar_productos(formato), formato, 'productos')
+
+
 @admin_bp.route('/productos/registrar', methods=['GET', 'POST'])
 def registrar_producto():
     if not session.get('user_rol') == 'admin':
@@ -341,22 +586,7 @@ def registrar_producto():
         else:
             garantia_fecha = None
 
-        unidad_map = {
-            'unidad': 1,
-            'pieza': 1,
-            'caja': 2,
-            'paquete': 3,
-            'set': 4,
-            'kit': 5
-        }
-        if not unidad or unidad.strip() == '':
-            unidad = 1
-        elif unidad.isdigit():
-            unidad = int(unidad)
-        elif unidad.lower() in unidad_map:
-            unidad = unidad_map[unidad.lower()]
-        else:
-            unidad = 1
+        unidad = normalizar_unidad(unidad)
 
         try:
             precio_unitario = float(precio_unitario) if precio_unitario else 0.0
@@ -371,21 +601,7 @@ def registrar_producto():
         imagen_file = request.files.get('imagen')
         imagen_url = None
         if imagen_file and imagen_file.filename:
-            from werkzeug.utils import secure_filename
-            # Guardar SIEMPRE bajo el static_folder real de Flask
-            productos_dir = os.path.join(current_app.static_folder, 'productos')
-            if not os.path.exists(productos_dir):
-                os.makedirs(productos_dir)
-            filename = secure_filename(imagen_file.filename)
-            base, ext = os.path.splitext(filename)
-            i = 1
-            save_path = os.path.join(productos_dir, filename)
-            while os.path.exists(save_path):
-                filename = f"{base}_{i}{ext}"
-                save_path = os.path.join(productos_dir, filename)
-                i += 1
-            imagen_file.save(save_path)
-            imagen_url = f"/static/productos/{filename}"
+            imagen_url = _guardar_imagen_subida(imagen_file)
 
         if not nombre or not precio_unitario or not cantidad_stock or not id_categoria or not estado:
             flash('Todos los campos obligatorios deben ser completados.', 'error')
@@ -406,6 +622,8 @@ def registrar_producto():
         )
         db.session.add(nuevo_producto)
         db.session.commit()
+        _catalogo_modificado(producto=nuevo_producto)
+        admin_counters.adjust('productos', 1)
         flash('Producto registrado exitosamente.', 'success')
         return redirect(url_for('admin.admin_productos'))
     except Exception as e:
@@ -444,22 +662,7 @@ def editar_producto(producto_id):
         else:
             garantia_fecha = None
 
-        unidad_map = {
-            'unidad': 1,
-            'pieza': 1,
-            'caja': 2,
-            'paquete': 3,
-            'set': 4,
-            'kit': 5
-        }
-        if not unidad or unidad.strip() == '':
-            unidad = 1
-        elif unidad.isdigit():
-            unidad = int(unidad)
-        elif unidad.lower() in unidad_map:
-            unidad = unidad_map[unidad.lower()]
-        else:
-            unidad = 1
+        unidad = normalizar_unidad(unidad)
 
         try:
             precio_unitario = float(precio_unitario) if precio_unitario else 0.0
@@ -478,20 +681,7 @@ def editar_producto(producto_id):
             producto.imagen_url = None
 
         if imagen_file and imagen_file.filename:
-            from werkzeug.utils import secure_filename
-            productos_dir = os.path.join(current_app.static_folder, 'productos')
-            if not os.path.exists(productos_dir):
-                os.makedirs(productos_dir)
-            filename = secure_filename(imagen_file.filename)
-            base, ext = os.path.splitext(filename)
-            i = 1
-            save_path = os.path.join(productos_dir, filename)
-            while os.path.exists(save_path):
-                filename = f"{base}_{i}{ext}"
-                save_path = os.path.join(productos_dir, filename)
-                i += 1
-            imagen_file.save(save_path)
-            producto.imagen_url = f"/static/productos/{filename}"
+            producto.imagen_url = _guardar_imagen_subida(imagen_file)
 
         if not nombre or not precio_unitario or not cantidad_stock or not id_categoria or not estado:
             flash('Todos los campos obligatorios deben ser completados.', 'error')
@@ -509,6 +699,7 @@ def editar_producto(producto_id):
         producto.unidad = unidad
 
         db.session.commit()
+        _catalogo_modificado(producto=producto)
         flash('Producto actualizado correctamente.', 'success')
         return redirect(url_for('admin.admin_productos'))
     except Exception as e:
@@ -528,8 +719,17 @@ def eliminar_producto():
         return redirect(url_for('admin.admin_productos'))
     producto = Producto.query.get(int(id_producto))
     if producto:
-        db.session.delete(producto)
-        db.session.commit()
+        eliminado_id = producto.id_producto
+        try:
+            db.session.delete(producto)
+            db.session.commit()
+        except IntegrityError:
+            # Hay líneas de pedido que lo referencian (FK sin cascada)
+            db.session.rollback()
+            flash('No se puede eliminar el producto: tiene pedidos asociados.', 'error')
+            return redirect(url_for('admin.admin_productos'))
+        _catalogo_modificado(eliminado_id=eliminado_id)
+        admin_counters.adjust('productos', -1)
         flash('Producto eliminado correctamente.', 'success')
     else:
         flash('No se encontró el producto.', 'error')
@@ -557,8 +757,10 @@ def eliminar_imagen_producto():
         path = os.path.join(current_app.static_folder, rel)
         if rel and os.path.isfile(path):
             os.remove(path)
+        eliminar_variantes(current_app.static_folder, producto.imagen_url)
         producto.imagen_url = None
         db.session.commit()
+        _catalogo_modificado()
         flash('Imagen eliminada correctamente.', 'success')
     except Exception as e:
         current_app.logger.debug(f'Error eliminando imagen: {e}')
@@ -574,6 +776,9 @@ def autocomplete_admin_usuarios():
     if not q:
         return jsonify([])
     try:
+        suggestions = usuarios_autocomplete.search(q)
+        if suggestions is not None:
+            return jsonify(suggestions)
         results = User.query.filter(
             (User.nombre_completo.ilike(f"%{q}%")) | (User.correo.ilike(f"%{q}%"))
         ).limit(10).all()
@@ -582,3 +787,39 @@ def autocomplete_admin_usuarios():
     except Exception as e:
         current_app.logger.error(f"Error en autocomplete admin usuarios: {e}")
         return jsonify([])
+
+
+@admin_bp.route('/tareas')
+def admin_tareas():
+    if not session.get('user_rol') == 'admin':
+        flash('Acceso restringido solo para administradores.', 'error')
+        return redirect(url_for('main.home'))
+    estado = request.args.get('estado', '').strip()
+    if estado not in jobs.ESTADOS:
+        estado = ''
+    try:
+        store = jobs.get_store()
+        counts = store.counts()
+        tareas = store.recent(limit=100, estado=estado or None)
+    except Exception as e:
+        current_app.logger.error(f"Error al listar tareas: {e}")
+        counts = dict.fromkeys(jobs.ESTADOS, 0)
+        tareas = []
+    return render_template(
+        'admin_tareas.html', tareas=tareas, counts=counts, estado=estado,
+        estados=jobs.ESTADOS, modo=current_app.config.get('JOBS_MODE')
+    )
+
+
+@admin_bp.route('/tareas/<int:job_id>/reintentar', methods=['POST'])
+def reintentar_tarea(job_id):
+    if not session.get('user_rol') == 'admin':
+        flash('Acceso restringido solo para administradores.', 'error')
+        return redirect(url_for('main.home'))
+    if jobs.get_store().retry(job_id):
+        if current_app.config.get('JOBS_MODE') == 'thread':
+            jobs.ensure_worker_thread(current_app._get_current_object())
+        flash('Tarea reprogramada.', 'success')
+    else:
+        flash('Solo se pueden reintentar tareas fallidas.', 'error')
+    return redirect(url_for('admin.admin_tareas'))
@@ -1,10 +1,25 @@
-from flask import Blueprint, render_template, request, current_app, redirect, url_for, session, flash
-from models.models import Producto, Categoria, ContactMessage, db
+import datetime
+
+from flask import Blueprint, render_template, request, current_app, redirect, url_for, session, flash, jsonify
+from models.models import Producto, Categoria, ContactMessage, Pedido, db
+from services.catalog_cache import catalog_cache, ProductoVista
+from services.category_index import category_index
+from services.search import get_search_backend
+from services.cart_pricing import price_cart
+from services.admin_counters import admin_counters
+from services.page_cache import cached_page, marcar_degradada, page_cache
+from services.conditional import conditional_get, publicar_validador
+from services.autocomplete import productos_autocomplete
+from services import carrito
+from services import checkout as checkout_service
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
 main_bp = Blueprint('main', __name__)
 
 
 @main_bp.route('/')
+@cached_page
 def home():
     try:
         productos_destacados = Producto.query.order_by(Producto.id_producto.desc()).limit(8).all()
@@ -16,107 +31,183 @@ def home():
 
 
 @main_bp.route('/lista-precios')
+@cached_page
 def lista_precios():
     return render_template('lista_precios.html')
 
 
 @main_bp.route('/sobre-nosotros')
+@cached_page
 def sobre_nosotros():
     return render_template('sobre_nosotros.html')
 
 
+def _load_products_by_category(id_categoria):
+    productos = Producto.query.filter_by(id_categoria=id_categoria).all()
+    return [ProductoVista.from_model(p) for p in productos]
+
+
+def _productos_categoria(id_categoria):
+    # Los errores no se cachean
+    return catalog_cache.get_or_load(
+        ('categoria', id_categoria),
+        lambda: _load_products_by_category(id_categoria)
+    )
+
+
 def _get_products_by_category_name(category_name):
+    """Productos de una categoría, resuelta por slug (sin tildes ni mayúsculas).
+
+    La categoría se resuelve en memoria con category_index y el listado sale de la
+    cache del proceso; solo un fallo de cache hace la consulta por id_categoria.
+    El ETag de la página se publica a partir de ese mismo listado.
+    """
     try:
-        cat = Categoria.query.filter(Categoria.nombre.ilike(f"%{category_name}%")).first()
-        if not cat:
+        id_categoria = category_index.resolve(category_name)
+        if id_categoria is None:
             return []
-        return Producto.query.filter_by(id_categoria=cat.id_categoria).all()
+        productos = _productos_categoria(id_categoria)
+        publicar_validador(*_clave_categoria(id_categoria, productos))
+        return productos
     except Exception as e:
         current_app.logger.error(f"Error consultando productos por categoría '{category_name}': {e}")
+        marcar_degradada()
         return []
 
 
+def _version(ts):
+    return ts.strftime('%Y%m%d%H%M%S%f') if ts else '0'
+
+
+def _clave_categoria(id_categoria, productos):
+    ultimo = max((p.actualizado_at for p in productos if p.actualizado_at), default=None)
+    return f'c{id_categoria}-{len(productos)}-{_version(ultimo)}', ultimo
+
+
+def _validador_categoria(category_name):
+    """(clave, última modificación) de una categoría: cuántos productos tiene y el más reciente.
+
+    Sale del listado cacheado que se renderiza (sin consulta si está caliente), así el
+    ETag y el cuerpo siempre corresponden a los mismos datos.
+    """
+    id_categoria = category_index.resolve(category_name)
+    if id_categoria is None:
+        return None
+    return _clave_categoria(id_categoria, _productos_categoria(id_categoria))
+
+
+def _clave_producto(producto_id, actualizado_at):
+    return f'p{producto_id}-{_version(actualizado_at)}', actualizado_at
+
+
+def _validador_producto(producto_id):
+    row = db.session.query(Producto.actualizado_at).filter(Producto.id_producto == producto_id).first()
+    if row is None:
+        return None
+    return _clave_producto(producto_id, row.actualizado_at)
+
+
 @main_bp.route('/torres')
+@cached_page
+@conditional_get(_validador_categoria, 'Torres')
 def torres():
     try:
         desktops = _get_products_by_category_name('Torres')
         return render_template('torres.html', desktops=desktops)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /torres: {e}")
+        marcar_degradada()
         return render_template('torres.html', desktops=[])
 
 
 @main_bp.route('/laptops')
+@cached_page
+@conditional_get(_validador_categoria, 'Laptops')
 def laptops():
     try:
         laptops = _get_products_by_category_name('Laptops')
         return render_template('laptops.html', laptops=laptops)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /laptops: {e}")
+        marcar_degradada()
         return render_template('laptops.html', laptops=[])
 
 
 @main_bp.route('/procesadores')
+@cached_page
+@conditional_get(_validador_categoria, 'Procesadores')
 def procesadores():
     try:
         productos = _get_products_by_category_name('Procesadores')
         return render_template('procesadores.html', productos=productos)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /procesadores: {e}")
+        marcar_degradada()
         return render_template('procesadores.html', productos=[])
 
 
 @main_bp.route('/tarjetas-graficas')
+@cached_page
+@conditional_get(_validador_categoria, 'Tarjetas Gráficas')
 def tarjetas_graficas():
     try:
         productos = _get_products_by_category_name('Tarjetas Gráficas')
-        if not productos:
-            productos = _get_products_by_category_name('Tarjetas Graficas')
         return render_template('tarjetas_graficas.html', productos=productos)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /tarjetas-graficas: {e}")
+        marcar_degradada()
         return render_template('tarjetas_graficas.html', productos=[])
 
 
 @main_bp.route('/perifericos')
+@cached_page
+@conditional_get(_validador_categoria, 'Periféricos')
 def perifericos():
     try:
         productos = _get_products_by_category_name('Periféricos')
-        if not productos:
-            productos = _get_products_by_category_name('Perifericos')
         return render_template('perifericos.html', productos=productos)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /perifericos: {e}")
+        marcar_degradada()
         return render_template('perifericos.html', productos=[])
 
 
 @main_bp.route('/memorias')
+@cached_page
+@conditional_get(_validador_categoria, 'Memorias')
 def memorias():
     try:
         productos = _get_products_by_category_name('Memorias')
         return render_template('memorias.html', productos=productos)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /memorias: {e}")
+        marcar_degradada()
         return render_template('memorias.html', productos=[])
 
 
 @main_bp.route('/fuentes')
+@cached_page
+@conditional_get(_validador_categoria, 'Fuentes')
 def fuentes():
     try:
         productos = _get_products_by_category_name('Fuentes')
         return render_template('fuentes.html', productos=productos)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /fuentes: {e}")
+        marcar_degradada()
         return render_template('fuentes.html', productos=[])
 
 
 @main_bp.route('/juegos')
+@cached_page
+@conditional_get(_validador_categoria, 'Juegos')
 def juegos():
     try:
         productos = _get_products_by_category_name('Juegos')
         return render_template('juegos.html', productos=productos)
     except Exception as e:
         current_app.logger.error(f"Error en ruta /juegos: {e}")
+        marcar_degradada()
         return render_template('juegos.html', productos=[])
 
 
@@ -137,13 +228,17 @@ def test_home():
 @main_bp.route('/debug-categorias')
 def debug_categorias():
     try:
-        categorias = Categoria.query.all()
+        # Una sola consulta: conteo por categoría con LEFT JOIN + GROUP BY
+        categorias = db.session.query(
+            Categoria.id_categoria, Categoria.nombre, func.count(Producto.id_producto)
+        ).outerjoin(Producto, Producto.id_categoria == Categoria.id_categoria) \
+            .group_by(Categoria.id_categoria, Categoria.nombre) \
+            .order_by(Categoria.id_categoria).all()
         if not categorias:
             return "❌ No hay categorías en la base de datos.<br><br><a href='/'>Volver al inicio</a>"
         resultado = ["📋 Categorías existentes en la base de datos:<br><br>"]
-        for cat in categorias:
-            productos_count = Producto.query.filter_by(id_categoria=cat.id_categoria).count()
-            resultado.append(f"• ID: {cat.id_categoria} | Nombre: '{cat.nombre}' | Productos: {productos_count}")
+        for id_categoria, nombre, productos_count in categorias:
+            resultado.append(f"• ID: {id_categoria} | Nombre: '{nombre}' | Productos: {productos_count}")
         resultado.append("<br><br><a href='/'>Volver al inicio</a>")
         return "<br>".join(resultado)
     except Exception as e:
@@ -181,6 +276,11 @@ def init_data():
         for prod in productos:
             db.session.add(prod)
         db.session.commit()
+        category_index.refresh()
+        catalog_cache.invalidate()
+        page_cache.clear()
+        admin_counters.invalidate()
+        productos_autocomplete.rebuild()
         return f"✅ Datos iniciales insertados correctamente:<br>- {len(categorias)} categorías<br>- {len(productos)} productos<br><br><a href='/'>Ver tienda</a> | <a href='/test-db'>Verificar BD</a>"
     except Exception as e:
         return f"❌ Error al insertar datos: {e}"
@@ -190,24 +290,35 @@ def init_data():
 @main_bp.route('/buscar')
 def buscar():
     q = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 24, type=int), 1), 100)
     productos = []
+    resultado = None
     try:
         if q:
-            like = f"%{q}%"
-            productos = Producto.query.filter(
-                (Producto.nombre.ilike(like)) | (Producto.descripcion_detallada.ilike(like))
-            ).all()
+            resultado = get_search_backend().search(q, page=page, per_page=per_page)
+            if resultado.ids:
+                # Solo se cargan las filas de la página, en el orden de relevancia
+                por_id = {
+                    p.id_producto: p for p in Producto.query.options(joinedload(Producto.categoria))
+                    .filter(Producto.id_producto.in_(resultado.ids)).all()
+                }
+                productos = [por_id[i] for i in resultado.ids if i in por_id]
     except Exception as e:
         current_app.logger.error(f"Error en buscar: {e}")
         productos = []
-    return render_template('search_results.html', productos=productos, q=q)
+        resultado = None
+    return render_template('search_results.html', productos=productos, q=q, resultado=resultado, per_page=per_page)
 
 
 # --- Detalle de producto ---
 @main_bp.route('/producto/<int:producto_id>')
+@cached_page
+@conditional_get(_validador_producto)
 def producto_detalle(producto_id):
     try:
         producto = Producto.query.get_or_404(producto_id)
+        publicar_validador(*_clave_producto(producto_id, producto.actualizado_at))
         return render_template('product_detail.html', producto=producto)
     except Exception as e:
         current_app.logger.error(f"Error en producto_detalle {producto_id}: {e}")
@@ -218,53 +329,159 @@ def producto_detalle(producto_id):
 # --- Carrito mínimo en sesión ---
 @main_bp.route('/carrito')
 def ver_carrito():
-    carrito = session.get('carrito', {})
-    items = []
-    total = 0.0
+    cotizacion = None
     try:
-        for pid, qty in carrito.items():
-            p = Producto.query.get(int(pid))
-            if p:
-                subtotal = (p.precio_unitario or 0) * int(qty)
-                items.append({'producto': p, 'cantidad': int(qty), 'subtotal': subtotal})
-                total += subtotal
+        cotizacion = price_cart(carrito.leer())
     except Exception as e:
         current_app.logger.error(f"Error calculando carrito: {e}")
-    return render_template('carrito.html', items=items, total=total)
+    return render_template(
+        'carrito.html',
+        productos=cotizacion.lines if cotizacion else [],
+        total=cotizacion.total if cotizacion else 0,
+        cotizacion=cotizacion
+    )
+
+
+MAX_LINEAS_COTIZAR = 200
+
+
+@main_bp.route('/carrito/cotizar', methods=['GET', 'POST'])
+def cotizar_carrito():
+    """Cotización JSON del carrito de la sesión o de {'items': {id: cantidad}} enviado por POST.
+
+    Por POST se aceptan hasta MAX_LINEAS_COTIZAR productos (una sola consulta IN acotada).
+    """
+    items = carrito.leer()
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data.get('items'), dict):
+            return jsonify({'ok': False, 'error': 'Se esperaba items: {id_producto: cantidad}'}), 400
+        if len(data['items']) > MAX_LINEAS_COTIZAR:
+            return jsonify({'ok': False, 'error': f'Máximo {MAX_LINEAS_COTIZAR} productos por cotización'}), 400
+        items = data['items']
+    try:
+        cotizacion = price_cart(items)
+        return jsonify({'ok': True, **cotizacion.to_dict()})
+    except Exception as e:
+        current_app.logger.error(f"Error cotizando carrito: {e}")
+        return jsonify({'ok': False, 'error': 'Error interno'}), 500
 
 
 @main_bp.route('/carrito/agregar/<int:producto_id>', methods=['POST'])
 def agregar_al_carrito(producto_id):
-    carrito = session.get('carrito', {})
-    qty = int(request.form.get('cantidad', 1)) if request.form.get('cantidad') else 1
-    carrito[str(producto_id)] = carrito.get(str(producto_id), 0) + int(qty)
-    session['carrito'] = carrito
+    try:
+        qty = int(request.form.get('cantidad') or 1)
+    except ValueError:
+        qty = 1
+    if qty > 0:
+        carrito.agregar(producto_id, qty)
     # redirigir de vuelta al detalle con animación en la ui
     return redirect(url_for('main.producto_detalle', producto_id=producto_id) + '?carrito_anim=1')
 
 
+def _cantidades_del_formulario(form):
+    # El formulario envía cantidades[<id_producto>] y el botón eliminar=<id_producto>
+    # (quantity_<id_producto> se mantiene por compatibilidad)
+    cantidades = {}
+    for key, val in form.items():
+        if key.startswith('cantidades[') and key.endswith(']'):
+            pid = key[len('cantidades['):-1]
+        elif key.startswith('quantity_'):
+            pid = key[len('quantity_'):]
+        else:
+            continue
+        try:
+            cantidades[int(pid)] = int(val)
+        except ValueError:
+            pass
+    eliminar = form.get('eliminar')
+    if eliminar and eliminar.isdigit():
+        cantidades[int(eliminar)] = 0
+    return cantidades
+
+
 @main_bp.route('/carrito/actualizar', methods=['POST'])
 def actualizar_carrito():
-    carrito = session.get('carrito', {})
     try:
-        # esperar campos como quantity_<producto_id>
-        for key, val in request.form.items():
-            if key.startswith('quantity_'):
-                pid = key.split('quantity_')[1]
-                try:
-                    qty = int(val)
-                    if qty <= 0:
-                        carrito.pop(pid, None)
-                    else:
-                        carrito[pid] = qty
-                except Exception:
-                    pass
-        session['carrito'] = carrito
+        carrito.fijar(_cantidades_del_formulario(request.form))
     except Exception as e:
         current_app.logger.error(f"Error actualizando carrito: {e}")
     return redirect(url_for('main.ver_carrito'))
 
 
+# --- Checkout: reserva de stock y pedido ---
+@main_bp.route('/carrito/checkout', methods=['POST'])
+def checkout():
+    if not session.get('user_id'):
+        flash('Inicia sesión para finalizar la compra.', 'info')
+        return redirect(url_for('auth.login'))
+    try:
+        # Las cantidades editadas en el carrito se aplican antes de reservar
+        cantidades = _cantidades_del_formulario(request.form)
+        if cantidades:
+            carrito.fijar(cantidades)
+        pedido = checkout_service.reservar(carrito.leer(), session.get('user_id'), session.get('user_email'))
+    except checkout_service.CheckoutError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('main.ver_carrito'))
+    except Exception as e:
+        current_app.logger.error(f"Error en checkout: {e}")
+        flash('No se pudo procesar el pedido. Intenta de nuevo.', 'error')
+        return redirect(url_for('main.ver_carrito'))
+    carrito.vaciar()
+    return redirect(url_for('main.ver_pedido', pedido_id=pedido.id_pedido))
+
+
+def _pedido_visible(pedido_id):
+    pedido = db.session.get(Pedido, pedido_id)
+    if pedido is None:
+        return None
+    if pedido.id_usuario != session.get('user_id') and session.get('user_rol') != 'admin':
+        return None
+    return pedido
+
+
+@main_bp.route('/pedido/<int:pedido_id>')
+def ver_pedido(pedido_id):
+    pedido = _pedido_visible(pedido_id)
+    if pedido is None:
+        flash('No se encontró el pedido.', 'error')
+        return redirect(url_for('main.home'))
+    return render_template('pedido.html', pedido=pedido, ahora=datetime.datetime.utcnow())
+
+
+@main_bp.route('/pedido/<int:pedido_id>/confirmar', methods=['POST'])
+def confirmar_pedido(pedido_id):
+    if _pedido_visible(pedido_id) is None:
+        flash('No se encontró el pedido.', 'error')
+        return redirect(url_for('main.home'))
+    try:
+        if checkout_service.confirmar(pedido_id):
+            flash('¡Pedido confirmado! Gracias por tu compra.', 'success')
+        else:
+            flash('La reserva ya venció o el pedido no está pendiente.', 'error')
+    except Exception as e:
+        current_app.logger.error(f"Error confirmando pedido {pedido_id}: {e}")
+        flash('No se pudo confirmar el pedido.', 'error')
+    return redirect(url_for('main.ver_pedido', pedido_id=pedido_id))
+
+
+@main_bp.route('/pedido/<int:pedido_id>/cancelar', methods=['POST'])
+def cancelar_pedido(pedido_id):
+    if _pedido_visible(pedido_id) is None:
+        flash('No se encontró el pedido.', 'error')
+        return redirect(url_for('main.home'))
+    try:
+        if checkout_service.cancelar(pedido_id):
+            flash('Pedido cancelado.', 'info')
+        else:
+            flash('El pedido ya no está pendiente.', 'error')
+    except Exception as e:
+        current_app.logger.error(f"Error cancelando pedido {pedido_id}: {e}")
+        flash('No se pudo cancelar el pedido.', 'error')
+    return redirect(url_for('main.ver_pedido', pedido_id=pedido_id))
+
+
 # --- Contacto (GET muestra formulario, POST guarda mensaje) ---
 @main_bp.route('/contactanos', methods=['GET', 'POST'])
 def contactanos():
@@ -281,6 +498,7 @@ def contactanos():
         cm = ContactMessage(nombre=nombre, correo=correo, asunto=asunto, mensaje=mensaje, leido=False)
         db.session.add(cm)
         db.session.commit()
+        admin_counters.adjust('mensajes', 1)
         flash('Mensaje enviado. Gracias por contactarnos.', 'success')
     except Exception as e:
         current_app.logger.error(f"Error guardando mensaje de contacto: {e}")
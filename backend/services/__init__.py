@@ -0,0 +1 @@
+# Marks services as a package
@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from models.models import ContactMessage, Producto, User, db
+
+
+class AdminCounters:
+    """Contadores de los badges del panel admin, cacheados por worker.
+
+    Se recalculan con una sola consulta (tres subconsultas COUNT) cuando vence el
+    TTL; entre tanto las escrituras del admin los ajustan con `adjust()` para que el
+    worker que atendió el cambio muestre el valor correcto sin volver a contar.
+    """
+    FIELDS = ('productos', 'usuarios', 'mensajes')
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = None
+        self._expires_at = 0.0
+        self.refreshes = 0
+
+    def _count_all(self):
+        row = db.session.execute(select(
+            select(func.count()).select_from(Producto).scalar_subquery(),
+            select(func.count()).select_from(User).scalar_subquery(),
+            select(func.count()).select_from(ContactMessage)
+            .where(ContactMessage.leido.is_(False)).scalar_subquery(),
+        )).one()
+        return dict(zip(self.FIELDS, (int(v or 0) for v in row)))
+
+    def get(self):
+        with self._lock:
+            if self._values is not None and time.monotonic() < self._expires_at:
+                return dict(self._values)
+        values = self._count_all()
+        with self._lock:
+            self._values = values
+            self._expires_at = time.monotonic() + self.ttl
+            self.refreshes += 1
+        return dict(values)
+
+    def adjust(self, name, delta):
+        with self._lock:
+            if self._values is not None and name in self._values:
+                self._values[name] = max(0, self._values[name] + delta)
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+            self._expires_at = 0.0
+
+
+admin_counters = AdminCounters(ttl=int(os.getenv('ADMIN_COUNTERS_TTL', '30')))
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import current_app, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # opcional: sin Brotli solo se generan copias .gz
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+# Extensiones que se versionan y precomprimen
+EXTENSIONS = ('.css', '.js')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+MIMETYPES = {'.css': 'text/css', '.js': 'application/javascript'}
+
+# Bundles CSS: se concatenan en este orden (el mismo que tenían los <link> de las
+# plantillas base) y se minifican en un solo archivo por layout
+BUNDLES = {
+    'public': [
+        'css/_variables.css', 'css/layout.css', 'css/home.css', 'css/components.css',
+        'css/forms.css', 'css/product.css', 'css/responsive.css',
+    ],
+    'admin': [
+        'css/_variables.css', 'css/layout.css', 'css/components.css',
+        'css/forms.css', 'css/responsive.css', 'admin.css',
+    ],
+}
+BUNDLES_DIR = 'bundles'
+
+_CSS_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_CSS_COMMENTS = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACES = re.compile(r'\s+')
+# Sin ':' (en selectores 'a :hover' != 'a:hover') ni '+'/'-' (necesarios en calc())
+_CSS_PUNCT = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source):
+    """Minificador CSS conservador: comentarios, espacios y ';' finales, sin tocar strings."""
+    source = _CSS_COMMENTS.sub('', source)
+    parts = _CSS_STRINGS.split(source)
+    for i in range(0, len(parts), 2):
+        chunk = _CSS_SPACES.sub(' ', parts[i])
+        chunk = _CSS_PUNCT.sub(r'\1', chunk)
+        parts[i] = chunk.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def _sources(static_folder):
+    dist = os.path.join(static_folder, DIST_DIR)
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root).startswith(os.path.abspath(dist)):
+            continue
+        for name in sorted(files):
+            if name.endswith(EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def _escribir_atomico(path, data):
+    # Temporal por proceso: workers sin preload construyen a la vez al arrancar
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def write_fingerprinted(static_folder, logical, content):
+    """Escribe dist/<ruta>.<hash><ext> y sus copias .gz/.br; devuelve la ruta con hash."""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    base, ext = os.path.splitext(logical)
+    hashed = f'{base}.{digest}{ext}'
+    target = os.path.join(static_folder, DIST_DIR, hashed)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # mtime=0: misma entrada -> mismo .gz en todos los builds
+        _escribir_atomico(f'{target}.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _escribir_atomico(f'{target}.br', brotli.compress(content, quality=11))
+        # El original va al final: si existe, sus copias comprimidas ya están completas
+        _escribir_atomico(target, content)
+    return hashed
+
+
+def build_bundle(static_folder, name):
+    parts = []
+    for logical in BUNDLES[name]:
+        with open(os.path.join(static_folder, logical), encoding='utf-8') as fh:
+            parts.append(f'/* {logical} */\n' + fh.read())
+    return minify_css('\n'.join(parts)).encode('utf-8')
+
+
+def build(static_folder):
+    """Versiona por contenido los assets de static/, arma los bundles y escribe dist/manifest.json."""
+    manifest = {}
+    for logical, path in _sources(static_folder):
+        with open(path, 'rb') as fh:
+            manifest[logical] = write_fingerprinted(static_folder, logical, fh.read())
+    for name in BUNDLES:
+        logical = f'{BUNDLES_DIR}/{name}.css'
+        manifest[logical] = write_fingerprinted(static_folder, logical, build_bundle(static_folder, name))
+    _write_manifest(static_folder, manifest)
+    return manifest
+
+
+def _sources_signature(static_folder):
+    return max((os.stat(path).st_mtime_ns for _, path in _sources(static_folder)), default=0)
+
+
+def _write_manifest(static_folder, manifest):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _escribir_atomico(path, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def asset_url(filename):
+    """URL versionada de un asset de static/ (cae en la URL normal si no está en el manifiesto)."""
+    hashed = current_app.extensions.get('assets', {}).get(filename)
+    if hashed:
+        return url_for('static_dist', filename=hashed)
+    return url_for('static', filename=filename)
+
+
+def bundle_urls(name):
+    """URLs CSS de un layout ('public' o 'admin'): el bundle minificado si está
+    construido, o los archivos sueltos del bundle si no lo está."""
+    logical = f'{BUNDLES_DIR}/{name}.css'
+    if logical in current_app.extensions.get('assets', {}):
+        return [asset_url(logical)]
+    return [asset_url(source) for source in BUNDLES[name]]
+
+
+def _rebuild_if_changed():
+    """En desarrollo, reconstruye assets y bundles cuando cambia algún archivo fuente."""
+    app = current_app
+    if not (app.debug or app.config.get('ASSETS_AUTO_REBUILD')):
+        return
+    signature = _sources_signature(app.static_folder)
+    if signature != app.extensions.get('assets_signature'):
+        app.extensions['assets'] = build(app.static_folder)
+        app.extensions['assets_signature'] = signature
+        app.logger.info("Assets reconstruidos (cambios en static/)")
+
+
+def serve_dist(filename):
+    """Sirve dist/ con la variante precomprimida que acepte el cliente y caché inmutable."""
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    path = os.path.abspath(os.path.join(dist, filename))
+    if not path.startswith(os.path.abspath(dist) + os.sep) or not os.path.isfile(path):
+        return current_app.response_class('Not Found', status=404)
+    mimetype = MIMETYPES.get(os.path.splitext(path)[1]) or 'application/octet-stream'
+    accepted = request.accept_encodings
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[candidate] and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Construye los assets versionados al arrancar y registra la ruta y el helper."""
+    app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>', 'static_dist', serve_dist)
+    app.add_template_global(asset_url)
+    app.add_template_global(bundle_urls)
+    app.config.setdefault('ASSETS_AUTO_REBUILD', os.getenv('ASSETS_AUTO_REBUILD') == '1')
+    app.before_request(_rebuild_if_changed)
+    try:
+        app.extensions['assets_signature'] = _sources_signature(app.static_folder)
+        app.extensions['assets'] = build(app.static_folder)
+        app.logger.info(f"Assets versionados: {len(app.extensions['assets'])}")
+    except OSError as e:
+        # static/ de solo lectura: se sirve el manifiesto de un build previo si existe
+        app.logger.warning(f"No se pudieron versionar los assets: {e}")
+        try:
+            with open(os.path.join(app.static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as fh:
+                app.extensions['assets'] = json.load(fh)
+        except (OSError, ValueError):
+            app.extensions['assets'] = {}
@@ -0,0 +1,189 @@
+import bisect
+import os
+import re
+import threading
+import time
+
+from flask import current_app
+
+from models.models import Producto, User, db
+from services.texto import fold_text
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+# Tope de candidatos que se revisan por consulta (prefijos de una letra en catálogos grandes)
+MAX_CANDIDATOS = 5000
+
+
+def _tokens(*valores):
+    tokens = []
+    for valor in valores:
+        for token in _TOKEN.findall(fold_text(valor)):
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+class PrefixIndex:
+    """Índice de autocompletado por prefijo, en memoria y por worker.
+
+    Guarda una lista ordenada de (token, id) con los textos sin tildes ni
+    mayúsculas; una consulta es un `bisect` al primer token con ese prefijo más un
+    recorrido de los contiguos, sin ir a la BD. Con varias palabras cada una debe
+    ser prefijo de alguna palabra del registro ('core i7', 'juan gmail').
+
+    Se carga al arrancar, se actualiza con `upsert()`/`remove()` en las escrituras
+    del admin y se recarga en segundo plano al vencer el TTL (cambios de otros
+    workers). Mientras no está cargado, `search()` devuelve None y el endpoint usa SQL.
+    """
+
+    def __init__(self, name, loader, ttl=300):
+        self.name = name
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = []
+        self._docs = {}
+        self._built_at = None
+        self._loading = False
+        # upsert()/remove() recibidos durante rebuild(); se reaplican antes del swap
+        self._pendientes = None
+        self.hits = 0
+
+    @property
+    def ready(self):
+        return self._built_at is not None
+
+    def rebuild(self):
+        with self._lock:
+            self._pendientes = []
+        try:
+            keys, docs = [], {}
+            for doc_id, textos, payload in self._loader():
+                tokens = _tokens(*textos)
+                docs[doc_id] = (tokens, ' '.join(_tokens(textos[0])), payload)
+                keys.extend((token, doc_id) for token in tokens)
+            keys.sort()
+            with self._lock:
+                self._keys, self._docs = keys, docs
+                for doc_id, textos, payload in self._pendientes:
+                    self._discard(doc_id)
+                    if textos is not None:
+                        self._insertar(doc_id, textos, payload)
+                self._built_at = time.monotonic()
+                return len(self._docs)
+        finally:
+            with self._lock:
+                self._pendientes = None
+
+    def _discard(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for token in doc[0]:
+            i = bisect.bisect_left(self._keys, (token, doc_id))
+            if i < len(self._keys) and self._keys[i] == (token, doc_id):
+                del self._keys[i]
+
+    def _insertar(self, doc_id, textos, payload):
+        tokens = _tokens(*textos)
+        self._docs[doc_id] = (tokens, ' '.join(_tokens(textos[0])), payload)
+        for token in tokens:
+            bisect.insort(self._keys, (token, doc_id))
+
+    def upsert(self, doc_id, textos, payload):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((doc_id, textos, payload))
+            if not self.ready:
+                return
+            self._discard(doc_id)
+            self._insertar(doc_id, textos, payload)
+
+    def remove(self, doc_id):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((doc_id, None, None))
+            if self.ready:
+                self._discard(doc_id)
+
+    def _ensure_fresh(self):
+        """Dispara una carga en segundo plano si está frío o vencido; nunca bloquea."""
+        vencido = not self.ready or time.monotonic() - self._built_at >= self.ttl
+        if vencido and not self._loading:
+            self._loading = True
+            app = current_app._get_current_object()
+            threading.Thread(target=self._background_rebuild, args=(app,), daemon=True).start()
+
+    def _background_rebuild(self, app):
+        try:
+            with app.app_context():
+                self.rebuild()
+        except Exception as e:
+            app.logger.warning(f"No se pudo cargar el índice de autocompletado '{self.name}': {e}")
+        finally:
+            self._loading = False
+
+    def search(self, q, limit=10):
+        """Payloads que coinciden con `q` (None si el índice aún no está cargado)."""
+        self._ensure_fresh()
+        terms = _tokens(q)
+        if not self.ready:
+            return None
+        if not terms:
+            return []
+        # El término más largo es el más selectivo: sus candidatos se filtran con el resto
+        principal = max(terms, key=len)
+        otros = [t for t in terms if t != principal]
+        with self._lock:
+            keys, docs = self._keys, self._docs
+            i = bisect.bisect_left(keys, (principal,))
+            candidatos = []
+            vistos = set()
+            while i < len(keys) and keys[i][0].startswith(principal) and len(vistos) < MAX_CANDIDATOS:
+                doc_id = keys[i][1]
+                if doc_id not in vistos:
+                    vistos.add(doc_id)
+                    doc = docs.get(doc_id)
+                    if doc and all(any(t.startswith(o) for t in doc[0]) for o in otros):
+                        candidatos.append(doc)
+                i += 1
+        self.hits += 1
+        frase = ' '.join(terms)
+        # Primero los que empiezan por lo escrito, luego orden alfabético
+        candidatos.sort(key=lambda doc: (not doc[1].startswith(frase), doc[1]))
+        return [doc[2] for doc in candidatos[:limit]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'registros': len(self._docs),
+                'claves': len(self._keys),
+                'ttl': self.ttl,
+                'ready': self.ready,
+                'consultas': self.hits,
+            }
+
+
+def producto_autocomplete_doc(producto):
+    return producto.id_producto, (producto.nombre,), {'id': producto.id_producto, 'nombre': producto.nombre}
+
+
+def usuario_autocomplete_doc(usuario):
+    return usuario.id_usuario, (usuario.nombre_completo, usuario.correo), {
+        'id': usuario.id_usuario, 'nombre': usuario.nombre_completo, 'correo': usuario.correo,
+    }
+
+
+def _cargar_productos():
+    rows = db.session.query(Producto.id_producto, Producto.nombre).yield_per(2000)
+    return (producto_autocomplete_doc(row) for row in rows)
+
+
+def _cargar_usuarios():
+    rows = db.session.query(User.id_usuario, User.nombre_completo, User.correo).yield_per(2000)
+    return (usuario_autocomplete_doc(row) for row in rows)
+
+
+_ttl = int(os.getenv('AUTOCOMPLETE_TTL', '300'))
+productos_autocomplete = PrefixIndex('productos', _cargar_productos, ttl=_ttl)
+usuarios_autocomplete = PrefixIndex('usuarios', _cargar_usuarios, ttl=_ttl)
@@ -0,0 +1,68 @@
+from flask import session
+
+# session['carrito'] = {'id_producto': cantidad} (claves str: la sesión se serializa en JSON)
+# session['carrito_n'] = unidades totales, mantenido en cada escritura para el badge
+CLAVE = 'carrito'
+CLAVE_N = 'carrito_n'
+MAX_CANTIDAD = 999
+
+
+def leer():
+    return dict(session.get(CLAVE) or {})
+
+
+def contar():
+    """Unidades en el carrito sin recorrerlo (sesiones antiguas sin contador se recalculan)."""
+    n = session.get(CLAVE_N)
+    if n is None:
+        carrito = session.get(CLAVE) or {}
+        if not carrito:
+            return 0
+        n = 0
+        for v in carrito.values():
+            try:
+                n += int(v)
+            except (TypeError, ValueError):
+                pass
+    return n
+
+
+def _guardar(carrito):
+    carrito = {pid: qty for pid, qty in carrito.items() if qty > 0}
+    if carrito:
+        session[CLAVE] = carrito
+        session[CLAVE_N] = sum(carrito.values())
+    else:
+        # Sin carrito no queda nada personal: el visitante vuelve a ser anónimo (cacheable)
+        session.pop(CLAVE, None)
+        session.pop(CLAVE_N, None)
+    return carrito
+
+
+def agregar(producto_id, cantidad=1):
+    carrito = leer()
+    pid = str(producto_id)
+    carrito[pid] = min(MAX_CANTIDAD, int(carrito.get(pid, 0)) + int(cantidad))
+    return _guardar(carrito)
+
+
+def fijar(cantidades):
+    """Aplica {id_producto: cantidad}; cantidad <= 0 quita el producto."""
+    carrito = leer()
+    for producto_id, cantidad in cantidades.items():
+        pid = str(producto_id)
+        if cantidad <= 0:
+            carrito.pop(pid, None)
+        else:
+            carrito[pid] = min(MAX_CANTIDAD, int(cantidad))
+    return _guardar(carrito)
+
+
+def quitar(producto_id):
+    carrito = leer()
+    carrito.pop(str(producto_id), None)
+    return _guardar(carrito)
+
+
+def vaciar():
+    return _guardar({})
@@ -0,0 +1,124 @@
+from decimal import Decimal, InvalidOperation
+
+from models.models import Producto, db
+from services.catalog_cache import ProductoVista
+
+# Columnas necesarias para cotizar y pintar el carrito (nada de descripciones TEXT)
+_COLUMNAS = (
+    Producto.id_producto, Producto.nombre, Producto.precio_unitario,
+    Producto.cantidad_stock, Producto.imagen_url, Producto.estado,
+)
+
+CENTAVOS = Decimal('0.01')
+
+
+def _to_decimal(value):
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return Decimal('0')
+
+
+def _normalizar_carrito(carrito):
+    """Convierte {'<id>': cantidad} en {id: cantidad>0}, ignorando entradas inválidas."""
+    lineas = {}
+    for pid, qty in (carrito or {}).items():
+        # 1.5, Infinity o 1e999 (JSON) no son cantidades: int() truncaría o daría OverflowError
+        if isinstance(qty, float) and not qty.is_integer():
+            continue
+        try:
+            pid, qty = int(pid), int(qty)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if qty > 0:
+            lineas[pid] = lineas.get(pid, 0) + qty
+    return lineas
+
+
+class CartLine:
+    def __init__(self, producto, cantidad):
+        self.producto = producto
+        self.cantidad = cantidad
+        self.precio_unitario = _to_decimal(producto.precio_unitario)
+        self.subtotal = (self.precio_unitario * cantidad).quantize(CENTAVOS)
+        self.stock = producto.cantidad_stock or 0
+
+    @property
+    def sin_stock(self):
+        return self.stock <= 0
+
+    @property
+    def stock_insuficiente(self):
+        return self.cantidad > self.stock
+
+    def to_dict(self):
+        return {
+            'id_producto': self.producto.id_producto,
+            'nombre': self.producto.nombre,
+            'imagen_url': self.producto.web_imagen_url,
+            'precio_unitario': str(self.precio_unitario),
+            'cantidad': self.cantidad,
+            'subtotal': str(self.subtotal),
+            'stock': self.stock,
+            'sin_stock': self.sin_stock,
+            'stock_insuficiente': self.stock_insuficiente,
+        }
+
+
+class CartQuote:
+    def __init__(self, lines, faltantes):
+        self.lines = lines
+        self.faltantes = faltantes
+        self.total = sum((line.subtotal for line in lines), Decimal('0')).quantize(CENTAVOS)
+        self.cantidad_items = sum(line.cantidad for line in lines)
+
+    @property
+    def sin_stock(self):
+        return [line.producto.id_producto for line in self.lines if line.stock_insuficiente]
+
+    @property
+    def disponible(self):
+        """True si todas las líneas existen y tienen stock suficiente."""
+        return not self.faltantes and not self.sin_stock
+
+    def to_dict(self):
+        return {
+            'items': [line.to_dict() for line in self.lines],
+            'total': str(self.total),
+            'cantidad_items': self.cantidad_items,
+            'faltantes': self.faltantes,
+            'sin_stock': self.sin_stock,
+            'disponible': self.disponible,
+        }
+
+
+def price_cart(carrito):
+    """Cotiza un carrito {'<id_producto>': cantidad} con una sola consulta IN.
+
+    Los productos inexistentes o inactivos se reportan en `faltantes` y no suman al
+    total; las líneas con menos stock que la cantidad pedida quedan marcadas.
+    """
+    cantidades = _normalizar_carrito(carrito)
+    if not cantidades:
+        return CartQuote([], [])
+    rows = db.session.query(*_COLUMNAS).filter(Producto.id_producto.in_(list(cantidades))).all()
+    por_id = {}
+    for row in rows:
+        datos = row._asdict()
+        if datos.get('estado') == 'inactivo':
+            continue
+        por_id[datos['id_producto']] = ProductoVista(**datos)
+    lines = []
+    faltantes = []
+    # Conservar el orden en que se agregaron al carrito
+    for pid, qty in cantidades.items():
+        producto = por_id.get(pid)
+        if producto is None:
+            faltantes.append(pid)
+            continue
+        lines.append(CartLine(producto, qty))
+    return CartQuote(lines, faltantes)
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+from models.models import imagen_web_url
+
+
+class ProductoVista:
+    """Copia de solo lectura de un Producto, segura para compartir entre requests.
+
+    Las instancias ORM quedan ligadas a la sesión del request que las cargó; para
+    guardarlas en memoria del proceso se copian las columnas que usan las plantillas
+    de listado (mismos nombres y propiedades que Producto).
+    """
+    __slots__ = (
+        'id_producto', 'nombre', 'descripcion_detallada', 'precio_unitario',
+        'cantidad_stock', 'imagen_url', 'id_categoria', 'estado', 'unidad', 'garantia_fecha',
+        'actualizado_at',
+    )
+
+    def __init__(self, **campos):
+        for campo in self.__slots__:
+            setattr(self, campo, campos.get(campo))
+
+    @classmethod
+    def from_model(cls, producto):
+        return cls(**{campo: getattr(producto, campo) for campo in cls.__slots__})
+
+    @property
+    def imagen(self):
+        return self.imagen_url or ''
+
+    @property
+    def descripcion(self):
+        return self.descripcion_detallada or ''
+
+    @property
+    def web_imagen_url(self) -> str:
+        return imagen_web_url(self.imagen_url)
+
+    def __repr__(self):
+        return f"<ProductoVista {self.nombre}>"
+
+
+class CatalogCache:
+    """Cache read-through por proceso (worker) para listados del catálogo.
+
+    Cada entrada expira tras `ttl` segundos; las escrituras del admin llaman a
+    `invalidate()` para que el worker que atendió el cambio no sirva datos viejos.
+    Los demás workers se ponen al día al vencer el TTL.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Se incrementa en cada invalidación para descartar cargas que empezaron antes
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+
+catalog_cache = CatalogCache(ttl=int(os.getenv('CATALOG_CACHE_TTL', '300')))
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+from models.models import Categoria, db
+from services.texto import slugify
+
+
+class CategoryIndex:
+    """Índice en memoria slug -> id_categoria.
+
+    Reemplaza el `Categoria.nombre.ilike('%nombre%')` por request: los nombres se
+    normalizan (sin tildes ni mayúsculas) una sola vez al cargar, así 'Tarjetas
+    Gráficas' y 'tarjetas-graficas' resuelven a la misma categoría sin consultas.
+    Se carga al arrancar y se refresca al vencer el TTL o al cambiar categorías.
+    """
+
+    # Intervalo mínimo entre recargas provocadas por slugs desconocidos
+    MISS_REFRESH_INTERVAL = 30
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._slugs = {}
+        self._expires_at = 0.0
+        self._refreshed_at = 0.0
+
+    @property
+    def loaded(self):
+        return self._expires_at > 0
+
+    def refresh(self):
+        rows = db.session.query(Categoria.id_categoria, Categoria.nombre).all()
+        slugs = {}
+        for id_categoria, nombre in rows:
+            slug = slugify(nombre)
+            if slug and slug not in slugs:
+                slugs[slug] = id_categoria
+        now = time.monotonic()
+        with self._lock:
+            self._slugs = slugs
+            self._expires_at = now + self.ttl
+            self._refreshed_at = now
+        return len(slugs)
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def _lookup(self, slug):
+        found = self._slugs.get(slug)
+        if found is not None:
+            return found
+        # Equivalente en memoria del antiguo ilike '%nombre%'
+        for candidate, id_categoria in self._slugs.items():
+            if slug in candidate:
+                return id_categoria
+        return None
+
+    def resolve(self, name):
+        """Devuelve el id_categoria para un nombre o slug, o None si no existe."""
+        slug = slugify(name)
+        if not slug:
+            return None
+        if time.monotonic() >= self._expires_at:
+            self.refresh()
+            return self._lookup(slug)
+        found = self._lookup(slug)
+        if found is None and time.monotonic() - self._refreshed_at >= self.MISS_REFRESH_INTERVAL:
+            # Puede ser una categoría creada desde otro worker: recargar una vez
+            self.refresh()
+            found = self._lookup(slug)
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {
+                'categorias': len(self._slugs),
+                'ttl': self.ttl,
+                'loaded': self.loaded,
+            }
+
+
+category_index = CategoryIndex(ttl=int(os.getenv('CATEGORY_INDEX_TTL', '600')))
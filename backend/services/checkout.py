@@ -0,0 +1,199 @@
+import datetime
+import os
+
+from flask import current_app
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import OperationalError
+
+from models.models import db, Pedido, PedidoLinea, Producto
+from services import jobs
+from services.cart_pricing import price_cart
+from services.jobs import job_handler
+from services.page_cache import page_cache
+
+ESTADOS = ('reservado', 'confirmado', 'cancelado', 'expirado')
+RESERVA_TTL = int(os.getenv('RESERVA_TTL', '900'))
+# InnoDB: 1213 deadlock, 1205 lock wait timeout; la transacción se puede repetir entera
+_REINTENTABLES = (1213, 1205)
+INTENTOS_RESERVA = 3
+
+
+class CheckoutError(Exception):
+    """El carrito no se puede reservar (vacío, productos inexistentes o sin stock)."""
+
+    def __init__(self, mensaje, productos=()):
+        super().__init__(mensaje)
+        self.productos = list(productos)
+
+
+def _delta(cantidades):
+    # CASE id_producto WHEN 1 THEN 2 WHEN 7 THEN 1 ... END: una sola sentencia para todas las líneas
+    return case(cantidades, value=Producto.id_producto)
+
+
+def _ajustar_stock(cantidades, signo):
+    """UPDATE productos por lote; al descontar solo toca las filas con stock suficiente.
+
+    Devuelve cuántas filas cambiaron. Es atómico en la BD (sin leer-modificar-escribir):
+    dos reservas simultáneas del mismo producto nunca dejan stock negativo.
+    """
+    delta = _delta(cantidades)
+    stmt = update(Producto.__table__).where(Producto.id_producto.in_(list(cantidades)))
+    if signo < 0:
+        stmt = stmt.where(Producto.cantidad_stock >= delta)
+        nuevo = Producto.cantidad_stock - delta
+    else:
+        nuevo = Producto.cantidad_stock + delta
+    # actualizado_at explícito (UTC): el onupdate del ORM no aplica a UPDATE de Core
+    stmt = stmt.values(cantidad_stock=nuevo, actualizado_at=datetime.datetime.utcnow())
+    return db.session.execute(stmt).rowcount
+
+
+def _stock_modificado(ids):
+    """El detalle muestra el stock: sus páginas cacheadas ya no valen (ni su ETag).
+
+    Los listados por categoría siguen su TTL; su ETag sale del mismo listado cacheado,
+    así que cuerpo y validador no se desalinean.
+    """
+    page_cache.discard(*(f'/producto/{pid}' for pid in ids))
+
+
+def _sin_stock(cantidades):
+    rows = db.session.query(Producto.id_producto, Producto.cantidad_stock) \
+        .filter(Producto.id_producto.in_(list(cantidades))).all()
+    stock = {pid: (s or 0) for pid, s in rows}
+    return sorted(pid for pid, qty in cantidades.items() if stock.get(pid, 0) < qty)
+
+
+def _reintentable(error):
+    args = getattr(getattr(error, 'orig', None), 'args', ())
+    return bool(args) and args[0] in _REINTENTABLES
+
+
+def reservar(items, id_usuario=None, correo=None, ttl=None):
+    """Crea un pedido 'reservado' descontando el stock de todas sus líneas.
+
+    Una transacción corta: INSERT del pedido, UPDATE condicional del stock y luego
+    las líneas (executemany). El UPDATE va antes que las líneas para tomar de entrada
+    el bloqueo exclusivo de los productos; si las líneas fueran primero, su FK tomaría
+    un bloqueo compartido que el UPDATE tendría que ampliar, y dos reservas del mismo
+    producto se bloquearían mutuamente (deadlock). Si algún producto no alcanza, se
+    revierte todo y se lanza CheckoutError con los ids sin stock; un deadlock o una
+    espera agotada se reintentan desde cero.
+    """
+    cotizacion = price_cart(items)
+    if cotizacion.faltantes:
+        raise CheckoutError('Algunos productos ya no están disponibles.', cotizacion.faltantes)
+    cantidades = {line.producto.id_producto: line.cantidad for line in cotizacion.lines}
+    if not cantidades:
+        raise CheckoutError('El carrito está vacío.')
+    ttl = RESERVA_TTL if ttl is None else ttl
+    for intento in range(1, INTENTOS_RESERVA + 1):
+        try:
+            pedido = _insertar_reserva(cotizacion, cantidades, id_usuario, correo, ttl)
+            break
+        except OperationalError as e:
+            if not _reintentable(e) or intento == INTENTOS_RESERVA:
+                raise
+            current_app.logger.warning(f"Reserva reintentada ({intento}/{INTENTOS_RESERVA}): {e.orig}")
+    _stock_modificado(cantidades)
+    _programar_vencimiento(ttl)
+    return pedido
+
+
+def _insertar_reserva(cotizacion, cantidades, id_usuario, correo, ttl):
+    ahora = datetime.datetime.utcnow()
+    try:
+        pedido = Pedido(
+            id_usuario=id_usuario, correo=correo, estado='reservado', total=cotizacion.total,
+            creado_at=ahora, expira_at=ahora + datetime.timedelta(seconds=ttl)
+        )
+        db.session.add(pedido)
+        db.session.flush()
+        if _ajustar_stock(cantidades, -1) != len(cantidades):
+            db.session.rollback()
+            raise CheckoutError('No hay stock suficiente para algunos productos.', _sin_stock(cantidades))
+        db.session.execute(insert(PedidoLinea), [
+            {'id_pedido': pedido.id_pedido, 'id_producto': line.producto.id_producto,
+             'nombre': line.producto.nombre, 'cantidad': line.cantidad, 'precio_unitario': line.precio_unitario}
+            for line in cotizacion.lines
+        ])
+        db.session.commit()
+        return pedido
+    except CheckoutError:
+        raise
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _programar_vencimiento(ttl):
+    try:
+        if current_app.config.get('JOBS_MODE') != 'inline':
+            jobs.enqueue('expirar_reservas', {}, delay=ttl + 5)
+    except Exception as e:
+        # El barrido periódico (`flask checkout-expirar`) las libera igual
+        current_app.logger.warning(f"No se pudo programar el vencimiento de la reserva: {e}")
+
+
+def _cambiar_estado(id_pedido, estado, solo_vencido=False):
+    """Transición condicional desde 'reservado' (evita liberar dos veces el stock)."""
+    stmt = update(Pedido.__table__).where(Pedido.id_pedido == id_pedido, Pedido.estado == 'reservado')
+    ahora = datetime.datetime.utcnow()
+    if solo_vencido:
+        stmt = stmt.where(Pedido.expira_at <= ahora)
+    valores = {'estado': estado}
+    if estado == 'confirmado':
+        stmt = stmt.where(Pedido.expira_at > ahora)
+        valores['confirmado_at'] = ahora
+    return db.session.execute(stmt.values(**valores)).rowcount == 1
+
+
+def _liberar(id_pedido, estado, solo_vencido=False):
+    try:
+        if not _cambiar_estado(id_pedido, estado, solo_vencido):
+            db.session.rollback()
+            return False
+        cantidades = dict(db.session.query(PedidoLinea.id_producto, PedidoLinea.cantidad)
+                          .filter(PedidoLinea.id_pedido == id_pedido).all())
+        if cantidades:
+            _ajustar_stock(cantidades, +1)
+        db.session.commit()
+        _stock_modificado(cantidades)
+        return True
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def confirmar(id_pedido):
+    """Confirma una reserva vigente; False si ya venció o cambió de estado."""
+    try:
+        ok = _cambiar_estado(id_pedido, 'confirmado')
+        db.session.commit()
+        return ok
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def cancelar(id_pedido):
+    """Cancela una reserva y devuelve su stock."""
+    return _liberar(id_pedido, 'cancelado')
+
+
+def liberar_vencidas(limite=500):
+    """Devuelve al catálogo el stock de las reservas vencidas (una transacción por pedido)."""
+    ids = [r[0] for r in db.session.query(Pedido.id_pedido)
+           .filter(Pedido.estado == 'reservado', Pedido.expira_at <= datetime.datetime.utcnow())
+           .order_by(Pedido.expira_at).limit(limite).all()]
+    db.session.rollback()
+    return sum(1 for id_pedido in ids if _liberar(id_pedido, 'expirado', solo_vencido=True))
+
+
+@job_handler('expirar_reservas')
+def expirar_reservas():
+    liberadas = liberar_vencidas()
+    if liberadas:
+        current_app.logger.info(f"Reservas vencidas liberadas: {liberadas}")
+    return liberadas
@@ -0,0 +1,122 @@
+import datetime
+import functools
+import hashlib
+import json
+import os
+
+from flask import current_app, g, request, session
+
+from services.page_cache import is_anonymous, pagina_degradada
+
+_version_cache = {}
+
+
+def _version_sitio():
+    """Huella de las plantillas y assets desplegados: un deploy invalida los ETag."""
+    app = current_app._get_current_object()
+    version = _version_cache.get(id(app))
+    if version is None:
+        digest = hashlib.sha1()
+        for root, dirs, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder or 'templates'))):
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as fh:
+                    digest.update(name.encode('utf-8'))
+                    digest.update(fh.read())
+        digest.update(json.dumps(app.extensions.get('assets', {}), sort_keys=True).encode('utf-8'))
+        version = _version_cache[id(app)] = digest.hexdigest()[:10]
+    return version
+
+
+def _huella_sesion():
+    """Lo que de la sesión cambia el HTML (cabecera de login y contador del carrito)."""
+    personal = [session.get('user_email'), session.get('user_rol'), session.get('carrito') or {}]
+    if not any(personal):
+        return 'anon'
+    return hashlib.sha1(json.dumps(personal, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def _http_date(value):
+    # Las fechas de la BD son UTC sin zona; HTTP trabaja con resolución de segundos
+    return value.replace(microsecond=0, tzinfo=datetime.timezone.utc)
+
+
+def publicar_validador(clave, actualizado_at):
+    """La vista informa el validador de lo que acaba de renderizar (ahorra la consulta)."""
+    g.validador_pagina = (clave, actualizado_at)
+
+
+def _es_condicional():
+    return bool(request.if_none_match) or bool(request.if_modified_since)
+
+
+def _validadores(validado):
+    """(etag, last_modified) de un par (clave, actualizado_at)."""
+    clave, actualizado_at = validado
+    etag = f'{clave}-{_version_sitio()}-{_huella_sesion()}'
+    last_modified = _http_date(actualizado_at) if (actualizado_at and is_anonymous()) else None
+    return etag, last_modified
+
+
+def _no_modificado(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional_get(validador, *validador_args):
+    """Decorador: responde 304 a If-None-Match / If-Modified-Since antes de renderizar.
+
+    `validador(*validador_args, **view_kwargs)` devuelve (clave, actualizado_at) o None
+    si no hay validador (la vista responde normal). Antes de renderizar solo se llama
+    si el cliente manda un validador que comprobar; en un GET normal el ETag sale de
+    `publicar_validador()` si la vista lo llamó, o del validador tras renderizar.
+    El ETag combina la clave con la versión del sitio y la huella de la sesión;
+    Last-Modified solo se envía a visitantes anónimos, cuyo HTML es igual para todos.
+    Va debajo de @cached_page: los aciertos de la cache no llegan hasta aquí.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Los mensajes flash pendientes se consumen al renderizar
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            def validar():
+                try:
+                    return validador(*validador_args, **kwargs)
+                except Exception as e:
+                    current_app.logger.warning(f"Validador de {request.path} falló: {e}")
+                    return None
+
+            validado = None
+            if _es_condicional():
+                validado = validar()
+                if validado is not None:
+                    etag, last_modified = _validadores(validado)
+                    if _no_modificado(etag, last_modified):
+                        response = current_app.response_class(status=304)
+                        return _con_validadores(response, etag, last_modified)
+
+            g.pop('validador_pagina', None)
+            response = current_app.make_response(view(*args, **kwargs))
+            # Una página degradada no debe quedar validada con el ETag de los datos reales
+            if response.status_code != 200 or pagina_degradada():
+                return response
+            # Lo publicado por la vista describe exactamente lo que se renderizó
+            validado = g.pop('validador_pagina', None) or validado or validar()
+            if validado is None:
+                return response
+            return _con_validadores(response, *_validadores(validado))
+        return wrapper
+    return decorator
+
+
+def _con_validadores(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # Siempre revalidar: el contenido cambia con cada edición del catálogo
+    response.headers['Cache-Control'] = 'public, no-cache' if is_anonymous() else 'private, no-cache'
+    return response
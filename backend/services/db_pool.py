@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Estrategias de pre-ping (DB_POOL_PRE_PING):
+#   'always' -> SELECT 1 en cada checkout (pool_pre_ping de SQLAlchemy)
+#   'idle'   -> solo si la conexión estuvo inactiva más de DB_POOL_PING_IDLE segundos
+#   'off'    -> nunca (las conexiones caídas fallan en la primera consulta)
+PRE_PING_ESTRATEGIAS = ('always', 'idle', 'off')
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return int(default)
+
+
+class PoolStats:
+    """Contadores del pool de conexiones de este worker (proceso)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.soft_invalidations = 0
+            self.pings = 0
+            self.ping_failures = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.waits_over_10ms = 0
+
+    def add(self, campo, n=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + n)
+
+    def record_wait(self, elapsed):
+        with self._lock:
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+            if elapsed > 0.01:
+                self.waits_over_10ms += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'soft_invalidations': self.soft_invalidations,
+                'pings': self.pings,
+                'ping_failures': self.ping_failures,
+                'timeouts': self.timeouts,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'waits_over_10ms': self.waits_over_10ms,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.add('timeouts')
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+
+def pool_config():
+    estrategia = (os.getenv('DB_POOL_PRE_PING') or 'idle').strip().lower()
+    if estrategia not in PRE_PING_ESTRATEGIAS:
+        estrategia = 'idle'
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pre_ping': estrategia,
+        'ping_idle': _env_int('DB_POOL_PING_IDLE', 30),
+    }
+
+
+def engine_options(uri, connect_args=None):
+    """SQLALCHEMY_ENGINE_OPTIONS a partir de las variables DB_POOL_*."""
+    options = {}
+    if connect_args:
+        options['connect_args'] = connect_args
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        # SQLite en memoria usa su propio pool de una conexión
+        return options
+    cfg = pool_config()
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': cfg['pool_size'],
+        'max_overflow': cfg['max_overflow'],
+        'pool_recycle': cfg['pool_recycle'],
+        'pool_timeout': cfg['pool_timeout'],
+        'pool_pre_ping': cfg['pre_ping'] == 'always',
+    })
+    return options
+
+
+def _instrumentar(engine, cfg):
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        pool_stats.add('connects')
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_stats.add('checkouts')
+        if cfg['pre_ping'] != 'idle':
+            return
+        checkin_at = connection_record.info.get('checkin_at')
+        if checkin_at is None or time.monotonic() - checkin_at < cfg['ping_idle']:
+            return
+        pool_stats.add('pings')
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except Exception:
+            pool_stats.add('ping_failures')
+            # El pool descarta esta conexión y reintenta con una nueva
+            raise exc.DisconnectionError()
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_stats.add('checkins')
+        connection_record.info['checkin_at'] = time.monotonic()
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.add('invalidations')
+
+    @event.listens_for(engine, 'soft_invalidate')
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.add('soft_invalidations')
+
+
+def init_app(app, db):
+    """Registra los eventos del pool sobre el engine de Flask-SQLAlchemy."""
+    cfg = pool_config()
+    app.extensions['db_pool_config'] = cfg
+    with app.app_context():
+        engine = db.engine
+    _instrumentar(engine, cfg)
+    app.extensions['db_pool_engine'] = engine
+
+
+def pool_status(app):
+    """Estado del pool de este worker: tamaño, conexiones en uso, overflow y contadores."""
+    engine = app.extensions.get('db_pool_engine')
+    pool = engine.pool if engine is not None else None
+    estado = {'pid': os.getpid(), 'pool': type(pool).__name__ if pool else None}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            # SQLAlchemy lo reporta negativo mientras sobra capacidad base
+            'overflow': pool.overflow(),
+            'overflow_in_use': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+    estado['config'] = app.extensions.get('db_pool_config')
+    estado['stats'] = pool_stats.snapshot()
+    return estado
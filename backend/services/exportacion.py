@@ -0,0 +1,64 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+
+from flask import Response, stream_with_context
+
+FORMATOS = ('csv', 'jsonl')
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def filas_en_streaming(query, por_lote=1000):
+    """Recorre una consulta de columnas con cursor del lado del servidor.
+
+    yield_per activa stream_results: con PyMySQL el driver usa SSCursor y entrega las
+    filas por tandas en lugar de cargar el resultado completo en memoria.
+    """
+    for row in query.execution_options(yield_per=por_lote):
+        yield row._asdict()
+
+
+def _json_valor(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def serializar(filas, columnas, formato='csv', por_lote=1000):
+    """Convierte dicts en chunks de texto CSV/JSONL, uno cada `por_lote` filas."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    buffer = io.StringIO()
+    writer = None
+    if formato == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=columnas, extrasaction='ignore')
+        writer.writeheader()
+    pendientes = 0
+    for fila in filas:
+        if writer is not None:
+            writer.writerow(fila)
+        else:
+            buffer.write(json.dumps({k: _json_valor(fila.get(k)) for k in columnas}, ensure_ascii=False))
+            buffer.write('\n')
+        pendientes += 1
+        if pendientes >= por_lote:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def descarga(chunks, formato, prefijo):
+    """Respuesta en streaming como adjunto (el contexto del request sigue vivo al generar)."""
+    nombre = f"{prefijo}-{datetime.datetime.now():%Y%m%d-%H%M}.{formato}"
+    return Response(
+        stream_with_context(chunks),
+        content_type=f'{MIMETYPES[formato]}; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{nombre}"', 'Cache-Control': 'no-store'}
+    )
@@ -0,0 +1,204 @@
+import datetime
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+from models.models import Producto, db, imagen_web_url
+from services.catalog_cache import catalog_cache
+from services.jobs import job_handler
+from services.page_cache import page_cache
+
+# Caja máxima (px) de cada variante; nunca se amplía una imagen más pequeña
+VARIANTES = {
+    'thumb': 320,
+    'listado': 640,
+    'detalle': 1200,
+}
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+VARIANTES_DIR = 'variantes'
+
+# Los manifiestos ausentes se vuelven a buscar tras este tiempo (la imagen puede
+# estar procesándose en otro worker)
+_MISSING_TTL = 60
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+
+
+def _static_rel(imagen_url):
+    """'/static/productos/x.jpg' -> 'productos/x.jpg' (None si no es un archivo local)."""
+    u = (imagen_url or '').strip()
+    low = u.lower()
+    if not u or low.startswith('http://') or low.startswith('https://'):
+        return None
+    u = u.lstrip('/')
+    if u.startswith('static/'):
+        return u.split('static/', 1)[1]
+    return u if '/' in u else f'productos/{u}'
+
+
+def _manifest_path(static_folder, rel):
+    # La clave es el nombre completo: foo.jpg y foo.png no comparten manifiesto ni variantes
+    carpeta, nombre = os.path.split(rel)
+    return os.path.join(static_folder, carpeta, VARIANTES_DIR, f'{nombre}.json'), carpeta, nombre
+
+
+def _manifest_de(static_folder, rel):
+    """(manifiesto, ruta) de una imagen local.
+
+    Los manifiestos anteriores se nombraban solo por el stem (foo.json); se aceptan
+    mientras su 'original' sea esta misma imagen, hasta que se vuelva a procesar.
+    """
+    manifest_path, carpeta, nombre = _manifest_path(static_folder, rel)
+    manifest = _leer_manifest(manifest_path)
+    if manifest is None:
+        legado_path = os.path.join(static_folder, carpeta, VARIANTES_DIR, f'{os.path.splitext(nombre)[0]}.json')
+        legado = _leer_manifest(legado_path)
+        if legado and legado.get('original') == f'/static/{rel}':
+            return legado, legado_path
+    return manifest, manifest_path
+
+
+def _preparar(im, formato):
+    """Copia sin metadatos (EXIF, ICC, comentarios) en un modo que el formato admite."""
+    con_alfa = im.mode in ('RGBA', 'LA', 'P')
+    fuente = im.convert('RGBA' if con_alfa else 'RGB')
+    if con_alfa and formato != 'jpeg':
+        limpia = Image.new('RGBA', im.size, (0, 0, 0, 0))
+    else:
+        # JPEG no admite transparencia: se compone sobre fondo blanco
+        limpia = Image.new('RGB', im.size, (255, 255, 255))
+    # Image.new + paste descarta im.info (exif, icc_profile, etc.)
+    limpia.paste(fuente, mask=fuente.getchannel('A') if con_alfa else None)
+    return limpia
+
+
+def generar_variantes(static_folder, imagen_url):
+    """Genera las variantes WebP/JPEG de una imagen subida y escribe su manifiesto.
+
+    Devuelve el manifiesto (dict) o None si la imagen no es un archivo local.
+    """
+    rel = _static_rel(imagen_url)
+    if not rel:
+        return None
+    origen = os.path.join(static_folder, rel)
+    manifest_path, carpeta, clave = _manifest_path(static_folder, rel)
+    destino_dir = os.path.dirname(manifest_path)
+    os.makedirs(destino_dir, exist_ok=True)
+
+    manifest = {'original': f'/static/{rel}', 'variantes': {}}
+    with Image.open(origen) as original:
+        original = ImageOps.exif_transpose(original)
+        original.load()
+        for variante, lado in VARIANTES.items():
+            im = original.copy()
+            im.thumbnail((lado, lado), Image.LANCZOS)
+            generadas = {}
+            for formato, opciones in FORMATOS.items():
+                nombre = f'{clave}-{variante}.{"jpg" if formato == "jpeg" else formato}'
+                ruta = os.path.join(destino_dir, nombre)
+                _preparar(im, formato).save(ruta, **opciones)
+                generadas[formato] = {
+                    'url': f'/static/{carpeta}/{VARIANTES_DIR}/{nombre}',
+                    'ancho': im.width,
+                    'alto': im.height,
+                    'bytes': os.path.getsize(ruta),
+                }
+            manifest['variantes'][variante] = generadas
+
+    tmp = f'{manifest_path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, manifest_path)
+    with _manifest_lock:
+        _manifest_cache[manifest_path] = (float('inf'), manifest)
+    return manifest
+
+
+@job_handler('procesar_imagen')
+def procesar_imagen(imagen_url):
+    """Tarea en segundo plano: genera las variantes de una imagen ya guardada."""
+    if generar_variantes(current_app.static_folder, imagen_url) is None:
+        return
+    # El HTML cambia (<picture> con variantes): nuevas ETag y fuera de las caches. Los
+    # listados cacheados guardan actualizado_at (de ahí sale el ETag de la categoría),
+    # así que se invalidan igual que en las escrituras del admin
+    Producto.query.filter(Producto.imagen_url == imagen_url).update(
+        {Producto.actualizado_at: datetime.datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    catalog_cache.invalidate()
+    page_cache.clear()
+
+
+def eliminar_variantes(static_folder, imagen_url):
+    rel = _static_rel(imagen_url)
+    if not rel:
+        return
+    manifest, manifest_path = _manifest_de(static_folder, rel)
+    if manifest:
+        for generadas in manifest.get('variantes', {}).values():
+            for datos in generadas.values():
+                ruta = os.path.join(static_folder, datos['url'].split('/static/', 1)[1])
+                if os.path.isfile(ruta):
+                    os.remove(ruta)
+        if os.path.isfile(manifest_path):
+            os.remove(manifest_path)
+    with _manifest_lock:
+        _manifest_cache.pop(manifest_path, None)
+
+
+def _leer_manifest(manifest_path):
+    now = time.monotonic()
+    with _manifest_lock:
+        cached = _manifest_cache.get(manifest_path)
+        if cached and cached[0] > now:
+            return cached[1]
+    try:
+        with open(manifest_path, encoding='utf-8') as fh:
+            manifest = json.load(fh)
+        expires = float('inf')
+    except (OSError, ValueError):
+        manifest = None
+        expires = now + _MISSING_TTL
+    with _manifest_lock:
+        _manifest_cache[manifest_path] = (expires, manifest)
+    return manifest
+
+
+def variante_url(imagen_url, contexto='thumb', formato='jpeg'):
+    """URL de una variante generada, o None si la imagen no tiene variantes."""
+    rel = _static_rel(imagen_url)
+    if not rel:
+        return None
+    manifest, _ = _manifest_de(current_app.static_folder, rel)
+    generadas = ((manifest or {}).get('variantes', {}).get(contexto) or {})
+    return (generadas.get(formato) or {}).get('url')
+
+
+def imagen_variante(producto, contexto='listado'):
+    """URLs de la variante adecuada para un contexto ('thumb', 'listado', 'detalle').
+
+    Devuelve {'webp': url|None, 'jpeg': url, 'ancho': int|None, 'alto': int|None};
+    si la imagen no tiene variantes se usa `web_imagen_url` tal cual.
+    """
+    imagen_url = getattr(producto, 'imagen_url', producto)
+    rel = _static_rel(imagen_url)
+    if rel:
+        manifest, _ = _manifest_de(current_app.static_folder, rel)
+        generadas = (manifest or {}).get('variantes', {}).get(contexto)
+        if generadas:
+            jpeg = generadas.get('jpeg') or {}
+            return {
+                'webp': (generadas.get('webp') or {}).get('url'),
+                'jpeg': jpeg.get('url'),
+                'ancho': jpeg.get('ancho'),
+                'alto': jpeg.get('alto'),
+            }
+    return {'webp': None, 'jpeg': imagen_web_url(imagen_url), 'ancho': None, 'alto': None}
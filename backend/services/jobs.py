@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+
+from flask import current_app
+
+ESTADOS = ('pendiente', 'en_proceso', 'completado', 'fallido')
+
+# tipo -> función(**payload); se registran con @job_handler('tipo')
+HANDLERS = {}
+
+
+def job_handler(tipo):
+    def decorator(fn):
+        HANDLERS[tipo] = fn
+        return fn
+    return decorator
+
+
+class SQLiteJobStore:
+    """Cola de tareas durable en un archivo SQLite local.
+
+    Los procesos web encolan y el worker reclama las tareas con una transacción
+    IMMEDIATE, de modo que varios consumidores nunca toman la misma tarea. Las
+    tareas 'en_proceso' cuyo worker murió vuelven a la cola tras `visibility_timeout`
+    (o quedan 'fallido' si ya agotaron sus intentos).
+    """
+
+    def __init__(self, path, visibility_timeout=300):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' tipo TEXT NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                " estado TEXT NOT NULL DEFAULT 'pendiente',"
+                ' intentos INTEGER NOT NULL DEFAULT 0,'
+                ' max_intentos INTEGER NOT NULL DEFAULT 3,'
+                ' disponible_at REAL NOT NULL,'
+                ' creado_at REAL NOT NULL,'
+                ' actualizado_at REAL NOT NULL,'
+                ' error TEXT)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_estado ON jobs (estado, disponible_at)')
+
+    def _connect(self):
+        # Una conexión por hilo y por proceso (no se comparten tras un fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, tipo, payload, max_intentos=3, delay=0):
+        now = time.time()
+        cur = self._connect().execute(
+            'INSERT INTO jobs (tipo, payload, max_intentos, disponible_at, creado_at, actualizado_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (tipo, json.dumps(payload), max_intentos, now + delay, now, now)
+        )
+        return cur.lastrowid
+
+    def claim(self):
+        """Reclama la siguiente tarea disponible (o None)."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Una tarea que tumba a su worker (OOM, segfault) no se reintenta para siempre
+            conn.execute(
+                "UPDATE jobs SET actualizado_at = ?,"
+                " estado = CASE WHEN intentos >= max_intentos THEN 'fallido' ELSE 'pendiente' END,"
+                " error = CASE WHEN intentos >= max_intentos"
+                " THEN 'El worker no terminó la tarea (visibility timeout)' ELSE error END"
+                " WHERE estado = 'en_proceso' AND actualizado_at < ?",
+                (now, now - self.visibility_timeout)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE estado = 'pendiente' AND disponible_at <= ?"
+                ' ORDER BY disponible_at, id LIMIT 1',
+                (now,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET estado = 'en_proceso', intentos = intentos + 1, actualizado_at = ?"
+                    ' WHERE id = ?',
+                    (now, row['id'])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        job = dict(row)
+        job['intentos'] += 1
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def complete(self, job_id):
+        self._connect().execute(
+            "UPDATE jobs SET estado = 'completado', error = NULL, actualizado_at = ? WHERE id = ?",
+            (time.time(), job_id)
+        )
+
+    def fail(self, job, error):
+        """Reprograma con backoff exponencial o marca 'fallido' al agotar los intentos."""
+        now = time.time()
+        if job['intentos'] < job['max_intentos']:
+            estado, disponible_at = 'pendiente', now + 2 ** job['intentos'] * 5
+        else:
+            estado, disponible_at = 'fallido', now
+        self._connect().execute(
+            'UPDATE jobs SET estado = ?, error = ?, disponible_at = ?, actualizado_at = ? WHERE id = ?',
+            (estado, error[-4000:], disponible_at, now, job['id'])
+        )
+        return estado
+
+    def retry(self, job_id):
+        now = time.time()
+        cur = self._connect().execute(
+            "UPDATE jobs SET estado = 'pendiente', intentos = 0, disponible_at = ?, actualizado_at = ?"
+            " WHERE id = ? AND estado = 'fallido'",
+            (now, now, job_id)
+        )
+        return cur.rowcount
+
+    def purge(self, older_than):
+        """Elimina tareas completadas hace más de `older_than` segundos."""
+        cur = self._connect().execute(
+            "DELETE FROM jobs WHERE estado = 'completado' AND actualizado_at < ?",
+            (time.time() - older_than,)
+        )
+        return cur.rowcount
+
+    def counts(self):
+        rows = self._connect().execute('SELECT estado, COUNT(*) FROM jobs GROUP BY estado').fetchall()
+        counts = dict.fromkeys(ESTADOS, 0)
+        counts.update({estado: total for estado, total in rows})
+        return counts
+
+    def recent(self, limit=50, estado=None):
+        sql = 'SELECT * FROM jobs'
+        params = []
+        if estado:
+            sql += ' WHERE estado = ?'
+            params.append(estado)
+        sql += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        return [dict(r) for r in self._connect().execute(sql, params).fetchall()]
+
+
+def run_job(app, store, job):
+    """Ejecuta una tarea reclamada dentro de un contexto de aplicación."""
+    handler = HANDLERS.get(job['tipo'])
+    try:
+        if handler is None:
+            raise LookupError(f"Sin handler para la tarea '{job['tipo']}'")
+        with app.app_context():
+            handler(**job['payload'])
+        store.complete(job['id'])
+        return True
+    except Exception as e:
+        estado = store.fail(job, traceback.format_exc())
+        app.logger.warning(f"Tarea {job['id']} ({job['tipo']}) falló [{estado}]: {e}")
+        return False
+
+
+def purgar_completadas(app, store=None):
+    """Borra las completadas con más de JOBS_RETENTION segundos; devuelve cuántas."""
+    store = store or get_store(app)
+    borradas = store.purge(app.config['JOBS_RETENTION'])
+    if borradas:
+        app.logger.info(f"Tareas completadas purgadas: {borradas}")
+    return borradas
+
+
+def run_worker(app, poll_interval=1.0, once=False):
+    """Bucle del worker: procesa tareas hasta que la cola quede vacía (once) o para siempre.
+
+    Cada JOBS_PURGE_INTERVAL segundos purga las tareas completadas antiguas.
+    """
+    store = get_store(app)
+    app.logger.info(f"Worker de tareas iniciado ({store.path})")
+    procesadas = 0
+    ultima_purga = None
+    while True:
+        if ultima_purga is None or time.monotonic() - ultima_purga >= app.config['JOBS_PURGE_INTERVAL']:
+            ultima_purga = time.monotonic()
+            try:
+                purgar_completadas(app, store)
+            except sqlite3.Error as e:
+                app.logger.warning(f"No se pudieron purgar las tareas completadas: {e}")
+        try:
+            job = store.claim()
+        except sqlite3.Error as e:
+            app.logger.warning(f"No se pudo reclamar una tarea: {e}")
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            if once:
+                return procesadas
+            time.sleep(poll_interval)
+            continue
+        run_job(app, store, job)
+        procesadas += 1
+
+
+_thread_lock = threading.Lock()
+_thread_pid = None
+
+
+def ensure_worker_thread(app):
+    """En modo 'thread' arranca (una vez por proceso) un consumidor en segundo plano."""
+    global _thread_pid
+    if _thread_pid == os.getpid():
+        return
+    with _thread_lock:
+        if _thread_pid == os.getpid():
+            return
+        _thread_pid = os.getpid()
+        threading.Thread(target=run_worker, args=(app,), daemon=True, name='jobs-worker').start()
+
+
+def get_store(app=None):
+    app = app or current_app
+    return app.extensions['jobs']
+
+
+def enqueue(tipo, payload=None, max_intentos=3, delay=0):
+    """Encola una tarea según JOBS_MODE: 'queue' (worker externo), 'thread' o 'inline'."""
+    app = current_app._get_current_object()
+    mode = app.config.get('JOBS_MODE', 'thread')
+    payload = payload or {}
+    if mode == 'inline':
+        HANDLERS[tipo](**payload)
+        return None
+    job_id = get_store(app).enqueue(tipo, payload, max_intentos=max_intentos, delay=delay)
+    if mode == 'thread':
+        ensure_worker_thread(app)
+    return job_id
+
+
+def init_app(app):
+    app.config.setdefault('JOBS_MODE', (os.getenv('JOBS_MODE') or 'thread').strip().lower())
+    app.config.setdefault('JOBS_DB_PATH', os.getenv('JOBS_DB_PATH') or os.path.join(app.instance_path, 'jobs.sqlite3'))
+    app.config.setdefault('JOBS_RETENTION', int(os.getenv('JOBS_RETENTION', str(7 * 86400))))
+    app.config.setdefault('JOBS_PURGE_INTERVAL', int(os.getenv('JOBS_PURGE_INTERVAL', '3600')))
+    app.extensions['jobs'] = SQLiteJobStore(app.config['JOBS_DB_PATH'])
@@ -0,0 +1,114 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import and_, or_
+
+MAX_PER_PAGE = 100
+
+
+def clamp_per_page(per_page, default=20):
+    try:
+        per_page = int(per_page)
+    except (TypeError, ValueError):
+        return default
+    return min(max(per_page, 1), MAX_PER_PAGE)
+
+
+def _a_json(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def _desde_json(column, value):
+    if value is None:
+        return None
+    if column.type.python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    return column.type.python_type(value)
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, [_a_json(v) for v in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """(direction, values) de un cursor, o None si falta o es inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw)
+        if direction not in ('next', 'prev') or len(values) != len(columns):
+            return None
+        return direction, [_desde_json(c, v) for c, v in zip(columns, values)]
+    except (ValueError, TypeError, AttributeError, NotImplementedError):
+        return None
+
+
+def _despues_de(columns, values, descending):
+    """Filas estrictamente posteriores a `values` en el orden (c1, c2, ...) dado.
+
+    Se expande a (c1 > v1) OR (c1 = v1 AND c2 > v2) ... para que MySQL use el índice.
+    """
+    condiciones = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        paso = column < value if descending else column > value
+        condiciones.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], paso))
+    return or_(*condiciones)
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def paginate_keyset(query, columns, cursor=None, per_page=20, descending=True, total=None):
+    """Pagina `query` por cursor sobre `columns` (clave única, p. ej. (creado_at, id)).
+
+    Sin OFFSET ni COUNT: cada página es un rango del índice. `cursor` es el token
+    opaco de la página anterior/siguiente; `total` se pasa ya calculado si se quiere
+    mostrar (la paginación no lo necesita).
+    """
+    decoded = decode_cursor(cursor, columns)
+    direction, values = decoded if decoded else ('next', None)
+    backwards = direction == 'prev'
+    # Hacia atrás se recorre el orden invertido y luego se da vuelta la página
+    desc_efectivo = descending != backwards
+    if values is not None:
+        query = query.filter(_despues_de(columns, values, desc_efectivo))
+    orden = [c.desc() if desc_efectivo else c.asc() for c in columns]
+    rows = query.order_by(*orden).limit(per_page + 1).all()
+    hay_mas = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def clave(row):
+        return [getattr(row, c.key) for c in columns]
+
+    if not rows:
+        return KeysetPage([], None, None, total)
+    if backwards:
+        has_prev, has_next = hay_mas, True
+    else:
+        has_prev, has_next = values is not None, hay_mas
+    return KeysetPage(
+        rows,
+        encode_cursor('next', clave(rows[-1])) if has_next else None,
+        encode_cursor('prev', clave(rows[0])) if has_prev else None,
+        total,
+    )
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+TAMANO_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Métricas en memoria de este worker, en formato de exposición de Prometheus.
+
+    Cada serie lleva la etiqueta worker=<pid>: con varios workers gunicorn cada scrape
+    llega a uno distinto y así las series no se mezclan (se suman en la consulta).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    @staticmethod
+    def _labels(pairs, extra=()):
+        pairs = tuple(pairs) + tuple(extra)
+        if not pairs:
+            return ''
+        body = ','.join(
+            '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for k, v in pairs
+        )
+        return '{' + body + '}'
+
+    def render(self):
+        worker = (('worker', os.getpid()),)
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.buckets), list(h.counts), h.sum, h.count))
+                for key, h in self._histograms.items()
+            )
+        lines = []
+        emitted = set()
+
+        def header(name):
+            if name not in emitted and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+            emitted.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f'{name}{self._labels(labels, worker)} {value}')
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            header(name)
+            acumulado = 0
+            for limite, n in zip(buckets, counts):
+                acumulado += n
+                lines.append(f'{name}_bucket{self._labels(labels, worker + (("le", limite),))} {acumulado}')
+            lines.append(f'{name}_bucket{self._labels(labels, worker + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{self._labels(labels, worker)} {round(total, 6)}')
+            lines.append(f'{name}_count{self._labels(labels, worker)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+registry.describe('http_requests_total', 'counter', 'Requests atendidos por endpoint, método y código.')
+registry.describe('http_request_duration_seconds', 'histogram', 'Latencia de los requests por endpoint.')
+registry.describe('http_response_size_bytes', 'histogram', 'Tamaño del cuerpo de la respuesta por endpoint.')
+registry.describe('sql_queries_per_request', 'histogram', 'Sentencias SQL ejecutadas por request.')
+registry.describe('sql_duration_seconds_total', 'counter', 'Tiempo total en sentencias SQL por endpoint.')
+registry.describe('template_render_seconds', 'histogram', 'Tiempo de render por plantilla.')
+
+
+def _estado():
+    estado = getattr(g, '_metrics', None)
+    if estado is None:
+        estado = g._metrics = {'inicio': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+                               'plantillas': [], 'registrado': False}
+    return estado
+
+
+def _before_request():
+    _estado()
+
+
+def _registrar(response_status, response_size):
+    estado = _estado()
+    if estado['registrado']:
+        return
+    estado['registrado'] = True
+    endpoint = request.endpoint or 'sin_endpoint'
+    duracion = time.perf_counter() - estado['inicio']
+    registry.inc('http_requests_total', {'endpoint': endpoint, 'method': request.method, 'status': response_status})
+    registry.observe('http_request_duration_seconds', {'endpoint': endpoint}, duracion, LATENCIA_BUCKETS)
+    registry.observe('sql_queries_per_request', {'endpoint': endpoint}, estado['sql_count'], SQL_COUNT_BUCKETS)
+    registry.inc('sql_duration_seconds_total', {'endpoint': endpoint}, round(estado['sql_time'], 6))
+    if response_size is not None:
+        registry.observe('http_response_size_bytes', {'endpoint': endpoint}, response_size, TAMANO_BUCKETS)
+
+
+def _after_request(response):
+    if response.direct_passthrough or response.is_streamed:
+        size = response.content_length
+    else:
+        size = len(response.get_data())
+    _registrar(response.status_code, size)
+    response.headers['X-SQL-Queries'] = str(_estado()['sql_count'])
+    return response
+
+
+def _teardown_request(exc):
+    # after_request no corre si la vista lanzó una excepción no manejada
+    if exc is not None and has_request_context():
+        _registrar(500, None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_inicio', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('metrics_inicio')
+    if not inicios:
+        return
+    elapsed = time.perf_counter() - inicios.pop()
+    if has_request_context():
+        estado = _estado()
+        estado['sql_count'] += 1
+        estado['sql_time'] += elapsed
+
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context():
+        _estado()['plantillas'].append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    if not has_request_context():
+        return
+    pila = _estado()['plantillas']
+    if pila:
+        registry.observe('template_render_seconds', {'template': template.name or '?'},
+                         time.perf_counter() - pila.pop(), LATENCIA_BUCKETS)
+
+
+def metrics_response():
+    from flask import current_app
+    return current_app.response_class(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app, db):
+    """Registra el middleware de métricas y los eventos del engine (METRICS_ENABLED=0 lo desactiva)."""
+    if os.getenv('METRICS_ENABLED', '1') == '0':
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,195 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import current_app, g, request, session
+
+# Claves de sesión que hacen que una página deje de ser igual para todos
+PERSONAL_SESSION_KEYS = ('user_email', 'carrito', '_flashes')
+# Cabeceras que se guardan con el cuerpo (las pone services/conditional.py)
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+class PageCache:
+    """Cache LRU con TTL de páginas HTML completas para visitantes anónimos.
+
+    Guarda el cuerpo ya renderizado por ruta más los parámetros que lee la vista.
+    Solo se usa con GET/HEAD sin sesión personal (sin login, carrito ni mensajes
+    flash) y solo se guardan respuestas 200 HTML que no tocaron la sesión, no ponen
+    cookies y no vienen degradadas (ver `marcar_degradada`). Junto al cuerpo se guardan
+    sus validadores (ETag, Last-Modified), de modo que un acierto responde también
+    los GET condicionales sin ir a la BD. Las escrituras del admin llaman a `clear()`;
+    los demás workers caducan por TTL.
+    """
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Se incrementa en cada purga para descartar renders que empezaron antes
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.purges = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, *keys):
+        """Quita páginas concretas (y descarta los renders de esas claves en curso)."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.purges += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'purges': self.purges,
+            }
+
+
+page_cache = PageCache(
+    max_entries=int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '256')),
+    ttl=int(os.getenv('PAGE_CACHE_TTL', '60')),
+)
+
+
+def marcar_degradada():
+    """La vista respondió sin sus datos (p. ej. la BD falló): esa página no se cachea."""
+    g.pagina_degradada = True
+
+
+def pagina_degradada():
+    return g.get('pagina_degradada', False)
+
+
+def is_anonymous():
+    """True si el visitante ve la versión genérica de las páginas (sin login, carrito ni flashes)."""
+    return not any(session.get(k) for k in PERSONAL_SESSION_KEYS)
+
+
+def _request_cacheable():
+    if not page_cache.enabled or request.method not in ('GET', 'HEAD'):
+        return False
+    return is_anonymous()
+
+
+def _response_cacheable(response):
+    return (
+        response.status_code == 200
+        and response.mimetype == 'text/html'
+        and not response.direct_passthrough
+        and 'Set-Cookie' not in response.headers
+        and not session.modified
+        and not pagina_degradada()
+    )
+
+
+def _cache_key(params):
+    """Ruta + parámetros que lee la vista; None si llegan otros (no se cachea).
+
+    Así una query string arbitraria (?x=1, ?x=2...) no crea entradas que desalojen
+    las páginas reales del LRU.
+    """
+    if any(k not in params for k in request.args):
+        return None
+    valores = [(k, v) for k in sorted(params) for v in request.args.getlist(k)]
+    return f"{request.path}?{urlencode(valores)}" if valores else request.path
+
+
+def _desde_cache(body, content_type, headers):
+    """Respuesta desde la cache; 304 si el validador del cliente es el de esta copia.
+
+    El ETag guardado es el del cuerpo guardado, así que comparar con él equivale a
+    servir la copia: no hace falta consultar la BD.
+    """
+    response = current_app.response_class(body, status=200, content_type=content_type, headers=headers)
+    response.headers['X-Page-Cache'] = 'HIT'
+    etag, _ = response.get_etag()
+    if request.if_none_match:
+        no_modificado = bool(etag) and request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and response.last_modified:
+        no_modificado = response.last_modified <= request.if_modified_since
+    else:
+        no_modificado = False
+    if no_modificado:
+        response.status_code = 304
+        response.set_data(b'')
+        response.headers.pop('Content-Type', None)
+    return response
+
+
+def cached_page(view=None, *, params=()):
+    """Decorador para vistas públicas: sirve el HTML cacheado a visitantes anónimos.
+
+    `params`: parámetros de la query string que cambian el HTML (forman la clave).
+    """
+    if view is None:
+        return functools.partial(cached_page, params=frozenset(params))
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _cache_key(params) if _request_cacheable() else None
+        if key is None:
+            return view(*args, **kwargs)
+        cached = page_cache.get(key)
+        if cached is not None:
+            return _desde_cache(*cached)
+        generation = page_cache.generation()
+        response = current_app.make_response(view(*args, **kwargs))
+        if _response_cacheable(response):
+            headers = [(h, response.headers[h]) for h in CACHED_HEADERS if h in response.headers]
+            page_cache.set(key, (response.get_data(), response.content_type, headers), generation)
+            response.headers['X-Page-Cache'] = 'MISS'
+        elif pagina_degradada():
+            response.headers['Cache-Control'] = 'no-store'
+        return response
+    return wrapper
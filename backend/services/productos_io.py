@@ -0,0 +1,287 @@
+import csv
+import datetime
+import io
+import json
+import threading
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import insert, update
+
+from models.models import db, Categoria, Producto
+from services.exportacion import FORMATOS, filas_en_streaming, serializar
+
+# Código numérico que se guarda en Producto.unidad (los formularios envían el nombre)
+UNIDADES = {
+    'unidad': 1,
+    'pieza': 1,
+    'caja': 2,
+    'paquete': 3,
+    'set': 4,
+    'kit': 5
+}
+
+COLUMNAS = [
+    'id_producto', 'nombre', 'descripcion_detallada', 'precio_unitario', 'cantidad_stock',
+    'stock_minimo', 'stock_maximo', 'imagen_url', 'id_categoria', 'categoria', 'estado',
+    'garantia_fecha', 'unidad',
+]
+# Valores de los productos nuevos para las columnas que el archivo no trae
+POR_DEFECTO = {
+    'descripcion_detallada': '',
+    'cantidad_stock': 0,
+    'stock_minimo': 0,
+    'stock_maximo': 1000,
+    'imagen_url': None,
+    'estado': 'activo',
+    'garantia_fecha': None,
+    'unidad': 1,
+}
+MAX_ERRORES = 50
+# productos.precio_unitario es DECIMAL(10, 2)
+PRECIO_MAXIMO = Decimal('100000000')
+
+
+def normalizar_unidad(unidad):
+    """Nombre o código de unidad -> código numérico (1 si viene vacío o no se reconoce)."""
+    unidad = str(unidad).strip() if unidad is not None else ''
+    if not unidad:
+        return 1
+    if unidad.isdigit():
+        return int(unidad)
+    return UNIDADES.get(unidad.lower(), 1)
+
+
+# --- Importación ---
+class FilaIlegible(ValueError):
+    """Línea que no se pudo leer (JSON mal formado); se reporta como cualquier fila inválida."""
+
+
+def leer_filas(stream, formato):
+    """Recorre un archivo CSV o JSONL (binario) fila por fila, sin cargarlo en memoria.
+
+    Genera (número de línea, dict); una línea JSON mal formada genera
+    (número de línea, FilaIlegible) en lugar de cortar la importación.
+    """
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        reader = csv.DictReader(texto)
+        for fila in reader:
+            yield reader.line_num, fila
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, FilaIlegible(f"JSON inválido: {e.msg} (columna {e.colno})")
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+def _vacio(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip())
+
+
+def _entero(fila, campo, defecto):
+    valor = fila.get(campo)
+    if _vacio(valor):
+        return defecto
+    try:
+        return int(str(valor).strip())
+    except ValueError:
+        raise ValueError(f"{campo} no es un entero: {valor!r}")
+
+
+def validar_fila(fila, categorias):
+    """Fila del archivo -> columnas de Producto. Lanza ValueError si no es válida.
+
+    La categoría puede venir por id (`id_categoria`) o por nombre (`categoria`);
+    `categorias` es el mapa nombre en minúsculas -> id, resuelto una sola vez.
+    """
+    if isinstance(fila, FilaIlegible):
+        raise fila
+    if not isinstance(fila, dict):
+        raise ValueError('la línea no es un objeto JSON')
+    nombre = (fila.get('nombre') or '').strip()
+    if not nombre:
+        raise ValueError('falta el nombre')
+    try:
+        precio = Decimal(str(fila.get('precio_unitario')).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"precio_unitario inválido: {fila.get('precio_unitario')!r}")
+    # NaN/Infinity: comparar NaN lanza InvalidOperation (no ValueError) e Infinity no cabe en la BD
+    if not precio.is_finite():
+        raise ValueError(f"precio_unitario inválido: {fila.get('precio_unitario')!r}")
+    if precio < 0:
+        raise ValueError('precio_unitario negativo')
+    if precio >= PRECIO_MAXIMO:
+        raise ValueError(f'precio_unitario fuera de rango (máximo {PRECIO_MAXIMO - Decimal("0.01")})')
+
+    id_categoria = _entero(fila, 'id_categoria', None)
+    if id_categoria is None:
+        nombre_categoria = (fila.get('categoria') or '').strip().lower()
+        id_categoria = categorias.get(nombre_categoria)
+        if id_categoria is None:
+            raise ValueError(f"categoría desconocida: {fila.get('categoria')!r}")
+    elif id_categoria not in categorias.values():
+        raise ValueError(f"id_categoria inexistente: {id_categoria}")
+
+    garantia = fila.get('garantia_fecha')
+    if _vacio(garantia):
+        garantia = None
+    else:
+        try:
+            garantia = datetime.datetime.strptime(str(garantia).strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"garantia_fecha inválida (AAAA-MM-DD): {garantia!r}")
+
+    valores = {
+        'nombre': nombre[:255],
+        'precio_unitario': precio,
+        'id_categoria': id_categoria,
+    }
+    # Los opcionales solo si vienen: al actualizar no se pisan con los valores por defecto
+    for campo in ('cantidad_stock', 'stock_minimo', 'stock_maximo', 'id_producto'):
+        entero = _entero(fila, campo, None)
+        if entero is not None:
+            valores[campo] = entero
+    for campo in ('descripcion_detallada', 'imagen_url', 'estado'):
+        if not _vacio(fila.get(campo)):
+            valores[campo] = str(fila[campo]).strip()
+    if garantia is not None:
+        valores['garantia_fecha'] = garantia
+    if not _vacio(fila.get('unidad')):
+        valores['unidad'] = normalizar_unidad(fila.get('unidad'))
+    return valores
+
+
+def _mapa_categorias():
+    return {nombre.lower(): id_categoria for id_categoria, nombre in
+            db.session.query(Categoria.id_categoria, Categoria.nombre) if nombre}
+
+
+def _guardar_lote(lote):
+    """Upsert de un lote: una consulta para ver qué existe, un INSERT y un UPDATE masivos.
+
+    Las filas con id_producto se emparejan por id; las demás por nombre exacto.
+    """
+    ids = {v['id_producto'] for v in lote if 'id_producto' in v}
+    nombres = {v['nombre'] for v in lote if 'id_producto' not in v}
+    existentes_id, existentes_nombre = set(), {}
+    if ids:
+        existentes_id = {r[0] for r in db.session.query(Producto.id_producto)
+                         .filter(Producto.id_producto.in_(ids))}
+    if nombres:
+        existentes_nombre = dict(db.session.query(Producto.nombre, Producto.id_producto)
+                                 .filter(Producto.nombre.in_(nombres)))
+    ahora = datetime.datetime.utcnow()
+    # Si un producto se repite dentro del lote gana la última fila
+    nuevos, cambios = {}, {}
+    for valores in lote:
+        valores['actualizado_at'] = ahora
+        if 'id_producto' in valores:
+            id_producto = valores['id_producto']
+            destino = cambios if id_producto in existentes_id else nuevos
+            destino[('id', id_producto)] = valores
+        elif valores['nombre'] in existentes_nombre:
+            valores['id_producto'] = existentes_nombre[valores['nombre']]
+            cambios[('id', valores['id_producto'])] = valores
+        else:
+            nuevos[('nombre', valores['nombre'])] = valores
+    if nuevos:
+        db.session.execute(insert(Producto), [{**POR_DEFECTO, **v} for v in nuevos.values()])
+    if cambios:
+        # UPDATE masivo por clave primaria (executemany, agrupado por columnas presentes)
+        db.session.execute(update(Producto), list(cambios.values()))
+    db.session.commit()
+    return len(nuevos), len(cambios)
+
+
+def importar_productos(filas, lote=1000, simular=False):
+    """Valida e inserta/actualiza productos desde un iterable de (línea, dict).
+
+    Trabaja por lotes de `lote` filas con un commit por lote, así la memoria no crece
+    con el archivo. Con `simular` solo valida. Devuelve el resumen con los primeros
+    MAX_ERRORES errores (línea y motivo); las filas con error se omiten.
+    """
+    categorias = _mapa_categorias()
+    resumen = {'leidas': 0, 'insertados': 0, 'actualizados': 0, 'errores': 0, 'detalle_errores': []}
+    buffer = []
+
+    def guardar():
+        if buffer and not simular:
+            nuevos, cambios = _guardar_lote(buffer)
+            resumen['insertados'] += nuevos
+            resumen['actualizados'] += cambios
+        buffer.clear()
+
+    try:
+        for numero, fila in filas:
+            resumen['leidas'] += 1
+            try:
+                buffer.append(validar_fila(fila, categorias))
+            except (ValueError, AttributeError) as e:
+                resumen['errores'] += 1
+                if len(resumen['detalle_errores']) < MAX_ERRORES:
+                    resumen['detalle_errores'].append({'linea': numero, 'error': str(e)})
+                continue
+            if len(buffer) >= lote:
+                guardar()
+        guardar()
+    except Exception:
+        db.session.rollback()
+        if resumen['insertados'] or resumen['actualizados']:
+            # Los lotes ya confirmados quedan en la BD: las caches no deben seguir sirviendo lo anterior
+            try:
+                catalogo_importado()
+            except Exception as e:
+                current_app.logger.warning(f"No se pudieron invalidar las caches tras la importación fallida: {e}")
+        raise
+    return resumen
+
+
+def _reconstruir_indices(app):
+    from services.autocomplete import productos_autocomplete
+    from services.search import get_search_backend
+    try:
+        with app.app_context():
+            productos_autocomplete.rebuild()
+            get_search_backend().rebuild()
+    except Exception as e:
+        app.logger.warning(f"No se pudieron reconstruir los índices tras la importación: {e}")
+
+
+def catalogo_importado():
+    """Las caches e índices del proceso no siguen una carga masiva fila a fila: se recargan.
+
+    Los índices en memoria se reconstruyen en un hilo (con 100k productos tarda
+    segundos) y mientras tanto siguen respondiendo con su contenido anterior.
+    """
+    from services.admin_counters import admin_counters
+    from services.catalog_cache import catalog_cache
+    from services.page_cache import page_cache
+
+    catalog_cache.invalidate()
+    page_cache.clear()
+    admin_counters.invalidate()
+    app = current_app._get_current_object()
+    threading.Thread(target=_reconstruir_indices, args=(app,), daemon=True).start()
+
+
+# --- Exportación ---
+def exportar_productos(formato='csv', por_lote=1000):
+    """Genera el catálogo completo como chunks de texto (para una respuesta en streaming)."""
+    query = (
+        db.session.query(
+            Producto.id_producto, Producto.nombre, Producto.descripcion_detallada,
+            Producto.precio_unitario, Producto.cantidad_stock, Producto.stock_minimo,
+            Producto.stock_maximo, Producto.imagen_url, Producto.id_categoria,
+            Categoria.nombre.label('categoria'), Producto.estado, Producto.garantia_fecha,
+            Producto.unidad,
+        )
+        .outerjoin(Categoria, Producto.id_categoria == Categoria.id_categoria)
+        .order_by(Producto.id_producto)
+    )
+    return serializar(filas_en_streaming(query, por_lote), COLUMNAS, formato, por_lote)
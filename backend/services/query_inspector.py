@@ -0,0 +1,94 @@
+import os
+import random
+import re
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+MODOS = ('off', 'warn', 'raise', 'sample')
+
+_ESPACIOS = re.compile(r'\s+')
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+_PARAM = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+
+
+class NPlusOneError(RuntimeError):
+    """Una misma consulta se repitió demasiadas veces en un request (modo 'raise')."""
+
+
+def forma_sql(statement):
+    """Forma normalizada de una sentencia: sin literales y con las listas IN colapsadas."""
+    forma = _ESPACIOS.sub(' ', statement).strip()
+    forma = _LITERALES.sub('?', forma)
+    forma = _PARAM.sub('?', forma)
+    return _LISTAS.sub('(?)', forma)
+
+
+def _config():
+    cfg = current_app.config
+    modo = (cfg.get('QUERY_INSPECTOR') or 'off').lower()
+    return modo if modo in MODOS else 'off'
+
+
+def _estado():
+    """Estado del request actual, o None si este request no se inspecciona."""
+    estado = getattr(g, '_query_inspector', None)
+    if estado is None:
+        modo = _config()
+        activo = modo != 'off'
+        if modo == 'sample':
+            activo = random.random() < current_app.config.get('QUERY_INSPECTOR_SAMPLE', 0.05)
+        estado = g._query_inspector = {'activo': activo, 'modo': modo, 'formas': {}, 'reportadas': set()}
+    return estado if estado['activo'] else None
+
+
+def _ruta():
+    return f"{request.method} {request.path} ({request.endpoint})"
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('inspector_inicio', []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('inspector_inicio')
+    elapsed = time.perf_counter() - inicios.pop() if inicios else 0.0
+    if not has_request_context():
+        return
+    estado = _estado()
+    if estado is None:
+        return
+    cfg = current_app.config
+    if elapsed * 1000 >= cfg.get('SLOW_QUERY_MS', 200):
+        current_app.logger.warning(
+            f"Consulta lenta ({elapsed * 1000:.1f} ms) en {_ruta()}: {_ESPACIOS.sub(' ', statement)[:500]}"
+        )
+    forma = forma_sql(statement)
+    veces = estado['formas'][forma] = estado['formas'].get(forma, 0) + 1
+    umbral = cfg.get('N_PLUS_ONE_THRESHOLD', 5)
+    if veces >= umbral and forma not in estado['reportadas']:
+        estado['reportadas'].add(forma)
+        mensaje = f"Posible N+1 en {_ruta()}: {veces} consultas con la forma {forma[:300]}"
+        if estado['modo'] == 'raise':
+            raise NPlusOneError(mensaje)
+        current_app.logger.warning(mensaje)
+
+
+def init_app(app, db):
+    """Inspector de consultas (QUERY_INSPECTOR = off | warn | raise | sample).
+
+    warn: registra consultas lentas (SLOW_QUERY_MS) y formas repetidas por request
+    (N_PLUS_ONE_THRESHOLD); raise: además falla el request en el N+1 (desarrollo y
+    pruebas); sample: como warn pero solo en una fracción de requests
+    (QUERY_INSPECTOR_SAMPLE), pensado para producción.
+    """
+    app.config.setdefault('QUERY_INSPECTOR', (os.getenv('QUERY_INSPECTOR') or 'off').strip().lower())
+    app.config.setdefault('SLOW_QUERY_MS', float(os.getenv('SLOW_QUERY_MS', '200')))
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD', int(os.getenv('N_PLUS_ONE_THRESHOLD', '5')))
+    app.config.setdefault('QUERY_INSPECTOR_SAMPLE', float(os.getenv('QUERY_INSPECTOR_SAMPLE', '0.05')))
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before)
+    event.listen(engine, 'after_cursor_execute', _after)
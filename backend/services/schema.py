@@ -0,0 +1,73 @@
+import datetime
+import os
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+MIGRACIONES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db')
+
+# Errores MySQL que indican que el cambio ya está aplicado (tabla, columna o índice existente)
+_YA_APLICADO = {1050, 1060, 1061}
+
+
+def _sentencias(sql):
+    """Sentencias de un script .sql (sin comentarios '--' ni USE: la BD es la de la URI)."""
+    lineas = [l for l in sql.splitlines() if not l.strip().startswith('--')]
+    for sentencia in '\n'.join(lineas).split(';'):
+        sentencia = sentencia.strip()
+        if sentencia and not sentencia.upper().startswith('USE '):
+            yield sentencia
+
+
+def _codigo_mysql(error):
+    args = getattr(getattr(error, 'orig', None), 'args', ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def _asegurar_tabla(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        ' nombre VARCHAR(255) NOT NULL PRIMARY KEY,'
+        ' aplicado_at DATETIME NOT NULL)'
+    ))
+
+
+def migraciones_pendientes(engine):
+    archivos = sorted(f for f in os.listdir(MIGRACIONES_DIR) if f.endswith('.sql'))
+    with engine.begin() as conn:
+        _asegurar_tabla(conn)
+        aplicadas = {r[0] for r in conn.execute(text('SELECT nombre FROM schema_migrations'))}
+    return [f for f in archivos if f not in aplicadas]
+
+
+def aplicar_migraciones(engine, fake=False, log=print):
+    """Ejecuta los scripts de backend/db que falten y los registra en schema_migrations.
+
+    Son idempotentes: si MySQL responde que la tabla/columna/índice ya existe (p. ej.
+    scripts aplicados a mano antes de existir este comando) la sentencia se omite.
+    Con `fake` solo se registran como aplicados. Devuelve los nombres aplicados.
+    """
+    if engine.dialect.name != 'mysql' and not fake:
+        log(f"Migraciones omitidas: los scripts de {MIGRACIONES_DIR} son para MySQL ({engine.dialect.name})")
+        return []
+    aplicadas = []
+    for nombre in migraciones_pendientes(engine):
+        with open(os.path.join(MIGRACIONES_DIR, nombre), encoding='utf-8') as fh:
+            sentencias = list(_sentencias(fh.read()))
+        with engine.begin() as conn:
+            if not fake:
+                for sentencia in sentencias:
+                    try:
+                        # MySQL confirma cada DDL por separado (commit implícito)
+                        conn.execute(text(sentencia))
+                    except (OperationalError, ProgrammingError) as e:
+                        if _codigo_mysql(e) not in _YA_APLICADO:
+                            raise
+                        log(f"  {nombre}: ya aplicado ({e.orig.args[1]})")
+            conn.execute(
+                text('INSERT INTO schema_migrations (nombre, aplicado_at) VALUES (:n, :t)'),
+                {'n': nombre, 't': datetime.datetime.utcnow()}
+            )
+        aplicadas.append(nombre)
+        log(f"{'Registrada' if fake else 'Aplicada'}: {nombre}")
+    return aplicadas
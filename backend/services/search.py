@@ -0,0 +1,301 @@
+import bisect
+import os
+import re
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from models.models import Producto, db
+from services.texto import fold_text
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Palabras demasiado frecuentes en nombres/descripciones para aportar relevancia
+STOPWORDS = frozenset({
+    'de', 'del', 'la', 'las', 'el', 'los', 'en', 'con', 'para', 'por', 'un', 'una',
+    'y', 'o', 'a', 'al', 'se', 'su', 'sus', 'que', 'es',
+})
+
+NOMBRE_WEIGHT = 3.0
+DESCRIPCION_WEIGHT = 1.0
+# Un término que solo coincide como prefijo ('lap' -> 'laptop') puntúa la mitad
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(value):
+    """Tokens normalizados (sin tildes, minúsculas, sin stopwords) de un texto."""
+    return [t for t in _TOKEN_RE.findall(fold_text(value)) if len(t) > 1 and t not in STOPWORDS]
+
+
+class SearchPage:
+    """Una página de resultados: ids ordenados por relevancia y total de coincidencias."""
+
+    def __init__(self, ids, total, page, per_page):
+        self.ids = ids
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+
+class InMemorySearchBackend:
+    """Índice invertido en proceso sobre nombre y descripción de productos.
+
+    Se construye en el primer uso (o en el warmup) con una sola consulta de columnas,
+    se actualiza incrementalmente desde las escrituras del admin y se reconstruye en
+    segundo plano al vencer el TTL para recoger cambios hechos en otros workers.
+    Para catálogos muy grandes con varios workers conviene el backend 'fulltext'.
+    """
+    name = 'memoria'
+
+    def __init__(self, ttl=900):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._nombre = {}
+        self._descripcion = {}
+        self._docs = {}
+        self._vocab = []
+        self._vocab_dirty = False
+        self._built_at = None
+        self._rebuilding = False
+        # Cambios recibidos mientras rebuild() lee el catálogo; se reaplican antes del swap
+        self._pendientes = None
+
+    @property
+    def ready(self):
+        return self._built_at is not None
+
+    # --- Construcción y mantenimiento ---
+    def rebuild(self):
+        with self._lock:
+            self._pendientes = []
+        try:
+            nombre, descripcion, docs = {}, {}, {}
+            rows = db.session.query(
+                Producto.id_producto, Producto.nombre, Producto.descripcion_detallada
+            ).yield_per(2000)
+            for id_producto, nombre_txt, desc_txt in rows:
+                self._add(nombre, descripcion, docs, id_producto, nombre_txt, desc_txt)
+            with self._lock:
+                self._nombre, self._descripcion, self._docs = nombre, descripcion, docs
+                # Una edición hecha durante la lectura puede no estar en las filas leídas
+                for id_producto, textos in self._pendientes:
+                    self._discard(id_producto)
+                    if textos is not None:
+                        self._add(self._nombre, self._descripcion, self._docs, id_producto, *textos)
+                self._vocab = sorted(set(self._nombre) | set(self._descripcion))
+                self._vocab_dirty = False
+                self._built_at = time.monotonic()
+                return len(self._docs)
+        finally:
+            with self._lock:
+                self._pendientes = None
+
+    @staticmethod
+    def _add(nombre, descripcion, docs, id_producto, nombre_txt, desc_txt):
+        tokens_nombre = frozenset(tokenize(nombre_txt))
+        tokens_desc = frozenset(tokenize(desc_txt))
+        for token in tokens_nombre:
+            nombre.setdefault(token, set()).add(id_producto)
+        for token in tokens_desc:
+            descripcion.setdefault(token, set()).add(id_producto)
+        docs[id_producto] = (tokens_nombre, tokens_desc)
+
+    def _discard(self, id_producto):
+        tokens = self._docs.pop(id_producto, None)
+        if not tokens:
+            return
+        for postings, doc_tokens in ((self._nombre, tokens[0]), (self._descripcion, tokens[1])):
+            for token in doc_tokens:
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(id_producto)
+                    if not ids:
+                        del postings[token]
+                        self._vocab_dirty = True
+
+    def index_product(self, producto):
+        with self._lock:
+            textos = (producto.nombre, producto.descripcion_detallada)
+            if self._pendientes is not None:
+                self._pendientes.append((producto.id_producto, textos))
+            if not self.ready:
+                return
+            self._discard(producto.id_producto)
+            self._add(self._nombre, self._descripcion, self._docs, producto.id_producto, *textos)
+            self._vocab_dirty = True
+
+    def remove_product(self, id_producto):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((id_producto, None))
+            if self.ready:
+                self._discard(id_producto)
+
+    def _ensure_fresh(self):
+        if not self.ready:
+            with self._lock:
+                if not self.ready:
+                    self.rebuild()
+            return
+        if time.monotonic() - self._built_at >= self.ttl and not self._rebuilding:
+            self._rebuilding = True
+            app = current_app._get_current_object()
+            threading.Thread(target=self._background_rebuild, args=(app,), daemon=True).start()
+
+    def _background_rebuild(self, app):
+        try:
+            with app.app_context():
+                self.rebuild()
+        except Exception as e:
+            app.logger.warning(f"No se pudo reconstruir el índice de búsqueda: {e}")
+        finally:
+            self._rebuilding = False
+
+    # --- Consulta ---
+    def _expand(self, term):
+        """Tokens del vocabulario que coinciden con el término (exacto y por prefijo)."""
+        if self._vocab_dirty:
+            self._vocab = sorted(set(self._nombre) | set(self._descripcion))
+            self._vocab_dirty = False
+        start = bisect.bisect_left(self._vocab, term)
+        for token in self._vocab[start:]:
+            if not token.startswith(term):
+                break
+            yield token, 1.0 if token == term else PREFIX_FACTOR
+
+    def _term_scores(self, term):
+        nombre_scores, desc_scores = {}, {}
+        for token, factor in self._expand(term):
+            for postings, weight, scores in (
+                (self._nombre, NOMBRE_WEIGHT, nombre_scores),
+                (self._descripcion, DESCRIPCION_WEIGHT, desc_scores),
+            ):
+                w = weight * factor
+                for id_producto in postings.get(token, ()):
+                    if scores.get(id_producto, 0) < w:
+                        scores[id_producto] = w
+        for id_producto, w in desc_scores.items():
+            nombre_scores[id_producto] = nombre_scores.get(id_producto, 0) + w
+        return nombre_scores
+
+    def search(self, q, page=1, per_page=24):
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return SearchPage([], 0, page, per_page)
+        self._ensure_fresh()
+        with self._lock:
+            totals = None
+            for term in terms:
+                scores = self._term_scores(term)
+                if totals is None:
+                    totals = scores
+                else:
+                    # Todas las palabras deben aparecer (AND)
+                    totals = {i: totals[i] + s for i, s in scores.items() if i in totals}
+                if not totals:
+                    break
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], -item[0]))
+        offset = (page - 1) * per_page
+        ids = [id_producto for id_producto, _ in ranked[offset:offset + per_page]]
+        return SearchPage(ids, len(ranked), page, per_page)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'ready': self.ready,
+                'productos': len(self._docs),
+                'tokens': len(self._nombre) + len(self._descripcion),
+                'ttl': self.ttl,
+            }
+
+
+class MySQLFulltextBackend:
+    """Búsqueda con índices FULLTEXT de MySQL (ver db/agregar_fulltext_productos.sql).
+
+    MySQL mantiene el índice por sí mismo, así que las notificaciones del admin son no-op.
+    """
+    name = 'fulltext'
+
+    _SCORE = (
+        "MATCH(nombre) AGAINST (:q IN BOOLEAN MODE) * :w_nombre"
+        " + MATCH(nombre, descripcion_detallada) AGAINST (:q IN BOOLEAN MODE) * :w_desc"
+    )
+    _WHERE = "MATCH(nombre, descripcion_detallada) AGAINST (:q IN BOOLEAN MODE)"
+
+    ready = True
+
+    @staticmethod
+    def _boolean_query(terms):
+        # +palabra* => todas las palabras requeridas, admitiendo prefijos
+        return ' '.join(f'+{t}*' for t in terms)
+
+    def search(self, q, page=1, per_page=24):
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return SearchPage([], 0, page, per_page)
+        params = {
+            'q': self._boolean_query(terms),
+            'w_nombre': NOMBRE_WEIGHT,
+            'w_desc': DESCRIPCION_WEIGHT,
+            'limit': per_page,
+            'offset': (page - 1) * per_page,
+        }
+        total = db.session.execute(
+            text(f"SELECT COUNT(*) FROM productos WHERE {self._WHERE}"), params
+        ).scalar() or 0
+        rows = db.session.execute(text(
+            f"SELECT id_producto, {self._SCORE} AS score FROM productos WHERE {self._WHERE}"
+            " ORDER BY score DESC, id_producto DESC LIMIT :limit OFFSET :offset"
+        ), params)
+        return SearchPage([r[0] for r in rows], total, page, per_page)
+
+    def rebuild(self):
+        return 0
+
+    def index_product(self, producto):
+        pass
+
+    def remove_product(self, id_producto):
+        pass
+
+    def stats(self):
+        return {'backend': self.name, 'ready': True}
+
+
+BACKENDS = {
+    InMemorySearchBackend.name: lambda: InMemorySearchBackend(ttl=int(os.getenv('SEARCH_INDEX_TTL', '900'))),
+    MySQLFulltextBackend.name: MySQLFulltextBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Backend configurado con SEARCH_BACKEND ('memoria' por defecto o 'fulltext')."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = (os.getenv('SEARCH_BACKEND') or InMemorySearchBackend.name).strip().lower()
+                factory = BACKENDS.get(name)
+                if factory is None:
+                    current_app.logger.warning(f"SEARCH_BACKEND '{name}' desconocido; usando '{InMemorySearchBackend.name}'")
+                    factory = BACKENDS[InMemorySearchBackend.name]
+                _backend = factory()
+    return _backend
@@ -0,0 +1,158 @@
+import datetime
+import random
+import time
+
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+# (categoría, descripción, tipos de producto, modelos) — mismas categorías que /init-data
+CATEGORIAS = [
+    ('Torres', 'Computadoras de escritorio completas',
+     ['PC Gamer', 'Workstation', 'Torre Oficina', 'Mini PC'], ['Ryzen 5', 'Ryzen 7', 'Core i5', 'Core i7']),
+    ('Laptops', 'Computadoras portátiles y ultrabooks',
+     ['Laptop', 'Ultrabook', 'Notebook Gamer'], ['ASUS', 'Lenovo', 'HP', 'Dell', 'Acer']),
+    ('Procesadores', 'CPUs Intel y AMD',
+     ['Procesador'], ['Intel Core i5', 'Intel Core i7', 'AMD Ryzen 5', 'AMD Ryzen 9']),
+    ('Tarjetas Gráficas', 'GPUs para gaming y trabajo profesional',
+     ['Tarjeta Gráfica'], ['RTX 4060', 'RTX 4070 Super', 'RX 7800 XT', 'RTX 4090']),
+    ('Periféricos', 'Teclados, ratones, monitores y más',
+     ['Teclado Mecánico', 'Mouse', 'Monitor', 'Audífonos'], ['Logitech', 'Razer', 'HyperX', 'Corsair']),
+    ('Memorias', 'RAM DDR4 y DDR5',
+     ['Memoria RAM', 'Kit RAM'], ['DDR4 16GB', 'DDR5 32GB', 'DDR5 64GB']),
+    ('Fuentes', 'Fuentes de poder certificadas',
+     ['Fuente de Poder'], ['650W 80+ Bronze', '750W 80+ Gold', '1000W 80+ Platinum']),
+    ('Juegos', 'Videojuegos para PC',
+     ['Juego PC'], ['Aventura', 'Rol', 'Estrategia', 'Deportes']),
+]
+ADJETIVOS = ['Pro', 'Max', 'Ultra', 'Lite', 'Plus', 'Edición Especial', 'V2', 'Elite']
+IMAGENES = ['/static/productos/lapto_1.jpeg', '/static/productos/lapto_2.jpeg', '/static/productos/lapto_3.jpeg', '']
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Camila', 'Andrés', 'Valentina', 'Carlos', 'Laura', 'Diego']
+APELLIDOS = ['Gómez', 'Rodríguez', 'Martínez', 'López', 'Díaz', 'Pérez', 'Castro', 'Romero']
+ASUNTOS = ['Garantía', 'Envío', 'Cotización', 'Soporte', 'Disponibilidad', 'Factura']
+PASSWORD_SEED = 'uparshop123'
+
+
+def _categorias(db, Categoria):
+    """Id por nombre de las categorías canónicas, creando las que falten."""
+    existentes = {c.nombre: c.id_categoria for c in Categoria.query.all()}
+    faltantes = [
+        {'nombre': nombre, 'descripcion': descripcion, 'estado': 'activo'}
+        for nombre, descripcion, _, _ in CATEGORIAS if nombre not in existentes
+    ]
+    if faltantes:
+        db.session.execute(insert(Categoria), faltantes)
+        db.session.commit()
+        existentes = {c.nombre: c.id_categoria for c in Categoria.query.all()}
+    return [existentes[nombre] for nombre, _, _, _ in CATEGORIAS]
+
+
+def _insertar_en_lotes(db, modelo, filas, lote):
+    """executemany por lotes, un commit por lote (la transacción no crece con la escala)."""
+    total = 0
+    buffer = []
+    for fila in filas:
+        buffer.append(fila)
+        if len(buffer) >= lote:
+            db.session.execute(insert(modelo), buffer)
+            db.session.commit()
+            total += len(buffer)
+            buffer = []
+    if buffer:
+        db.session.execute(insert(modelo), buffer)
+        db.session.commit()
+        total += len(buffer)
+    return total
+
+
+def sembrar(db, productos=0, usuarios=0, mensajes=0, semilla=42, lote=5000, log=None):
+    """Genera un catálogo sintético determinista (misma semilla, mismos datos).
+
+    Se agrega a lo que ya haya en la BD: las categorías se reutilizan por nombre y los
+    correos de usuarios se numeran desde el último id. Devuelve un resumen con conteos
+    y tiempos; los índices en memoria se recargan aparte (ver `recargar_indices`).
+    """
+    from models.models import Categoria, ContactMessage, Producto, User
+
+    rnd = random.Random(semilla)
+    ahora = datetime.datetime.utcnow()
+    resumen = {}
+    inicio = time.perf_counter()
+    ids_categoria = _categorias(db, Categoria)
+
+    def generar_productos():
+        for i in range(1, productos + 1):
+            k = rnd.randrange(len(CATEGORIAS))
+            _, _, tipos, modelos = CATEGORIAS[k]
+            nombre = f"{rnd.choice(tipos)} {rnd.choice(modelos)} {rnd.choice(ADJETIVOS)} {i}"
+            maximo = rnd.choice((20, 50, 100, 300))
+            yield {
+                'nombre': nombre,
+                'descripcion_detallada': f"{nombre}. Garantía de {rnd.randint(6, 36)} meses, envío a todo el país.",
+                'precio_unitario': round(rnd.uniform(50_000, 12_000_000), -2),
+                'cantidad_stock': rnd.randint(0, maximo),
+                'stock_minimo': max(1, maximo // 10),
+                'stock_maximo': maximo,
+                'imagen_url': rnd.choice(IMAGENES),
+                'id_categoria': ids_categoria[k],
+                'estado': 'activo' if rnd.random() > 0.05 else 'inactivo',
+                'unidad': 1,
+                'actualizado_at': ahora,
+            }
+
+    base_usuario = (db.session.query(func.max(User.id_usuario)).scalar() or 0) + 1
+    # Un solo hash para todos: hashear 100k contraseñas tomaría minutos
+    contrasena = generate_password_hash(PASSWORD_SEED) if usuarios else None
+
+    def generar_usuarios():
+        for n in range(base_usuario, base_usuario + usuarios):
+            yield {
+                'nombre_completo': f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {n}",
+                'correo': f"seed{n}@uparshop.test",
+                'telefono': f"3{rnd.randint(100000000, 999999999)}",
+                'direccion': f"Calle {rnd.randint(1, 120)} # {rnd.randint(1, 80)}-{rnd.randint(1, 99)}",
+                'contrasena': contrasena,
+                'rol': 'cliente',
+                'estado': 'activo' if rnd.random() > 0.1 else 'inactivo',
+            }
+
+    def generar_mensajes():
+        for i in range(1, mensajes + 1):
+            nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}"
+            yield {
+                'nombre': nombre,
+                'correo': f"cliente{i}@ejemplo.com",
+                'asunto': rnd.choice(ASUNTOS),
+                'mensaje': f"Hola, soy {nombre} y quisiera más información.",
+                'creado_at': ahora - datetime.timedelta(minutes=rnd.randint(0, 60 * 24 * 365)),
+                'leido': rnd.random() < 0.5,
+            }
+
+    for nombre, modelo, filas in (
+        ('productos', Producto, generar_productos()),
+        ('usuarios', User, generar_usuarios()),
+        ('mensajes', ContactMessage, generar_mensajes()),
+    ):
+        t = time.perf_counter()
+        resumen[nombre] = _insertar_en_lotes(db, modelo, filas, lote)
+        if log and resumen[nombre]:
+            log(f"{nombre}: {resumen[nombre]} en {time.perf_counter() - t:.2f} s")
+    resumen['segundos'] = round(time.perf_counter() - inicio, 2)
+    return resumen
+
+
+def recargar_indices():
+    """Invalida caches y reconstruye los índices en memoria tras una carga masiva."""
+    from services.admin_counters import admin_counters
+    from services.autocomplete import productos_autocomplete, usuarios_autocomplete
+    from services.catalog_cache import catalog_cache
+    from services.category_index import category_index
+    from services.page_cache import page_cache
+    from services.search import get_search_backend
+
+    category_index.refresh()
+    catalog_cache.invalidate()
+    page_cache.clear()
+    admin_counters.invalidate()
+    productos_autocomplete.rebuild()
+    usuarios_autocomplete.rebuild()
+    get_search_backend().rebuild()
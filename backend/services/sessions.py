@@ -0,0 +1,244 @@
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from hashlib import sha256
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+try:
+    import redis
+except ImportError:  # opcional: solo con SESSION_BACKEND=redis
+    redis = None
+
+BACKENDS = ('cookie', 'sqlite', 'redis')
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Sesión cuyo contenido vive en el servidor; la cookie solo lleva el id firmado."""
+
+    def __init__(self, initial=None, sid=None, new=False, expira_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expira_at = expira_at
+        self.modified = False
+        self.regenerar = False
+
+
+class SQLiteSessionStore:
+    """Sesiones en un archivo SQLite local (un worker o varios en la misma máquina).
+
+    Cada fila guarda la sesión serializada y su vencimiento; las vencidas se borran
+    en bloque con un solo DELETE (`purge_expired`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sesiones ('
+            ' sid TEXT PRIMARY KEY,'
+            ' data TEXT NOT NULL,'
+            ' expira_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_sesiones_expira ON sesiones (expira_at)')
+
+    def _connect(self):
+        # Una conexión por hilo y por proceso (no se comparten tras un fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute(
+            'SELECT data, expira_at FROM sesiones WHERE sid = ? AND expira_at > ?', (sid, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save(self, sid, data, ttl):
+        expira_at = time.time() + ttl
+        self._connect().execute(
+            'INSERT INTO sesiones (sid, data, expira_at) VALUES (?, ?, ?)'
+            ' ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expira_at = excluded.expira_at',
+            (sid, data, expira_at)
+        )
+        return expira_at
+
+    def touch(self, sid, ttl):
+        expira_at = time.time() + ttl
+        self._connect().execute('UPDATE sesiones SET expira_at = ? WHERE sid = ?', (expira_at, sid))
+        return expira_at
+
+    def delete(self, sid):
+        self._connect().execute('DELETE FROM sesiones WHERE sid = ?', (sid,))
+
+    def purge_expired(self):
+        return self._connect().execute('DELETE FROM sesiones WHERE expira_at <= ?', (time.time(),)).rowcount
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM sesiones').fetchone()[0]
+
+
+class RedisSessionStore:
+    """Sesiones en Redis (varias máquinas); Redis vence las claves solo (SETEX)."""
+
+    def __init__(self, url, prefix='uparshop:sesion:'):
+        if redis is None:
+            raise RuntimeError('SESSION_BACKEND=redis requiere el paquete redis')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + sid)
+        pipe.ttl(self.prefix + sid)
+        data, ttl = pipe.execute()
+        if data is None:
+            return None
+        return data.decode('utf-8'), time.time() + max(ttl, 0)
+
+    def save(self, sid, data, ttl):
+        self.client.setex(self.prefix + sid, int(ttl), data)
+        return time.time() + ttl
+
+    def touch(self, sid, ttl):
+        self.client.expire(self.prefix + sid, int(ttl))
+        return time.time() + ttl
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def purge_expired(self):
+        return 0
+
+    def count(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*', count=1000))
+
+
+class ServerSessionInterface(SessionInterface):
+    """Sesiones del lado del servidor con id aleatorio firmado en la cookie.
+
+    - No se crea sesión (ni cookie) mientras no se guarde nada: los visitantes
+      anónimos siguen siendo cacheables (ver services/page_cache.py).
+    - Solo se escribe en el store si la sesión cambió; el vencimiento por inactividad
+      (`ttl`) se renueva cuando ya pasó la mitad, no en cada request.
+    - Las vencidas se borran en bloque cada `purge_interval` segundos por worker.
+    """
+    serializer = session_json_serializer
+
+    def __init__(self, store, ttl=7 * 86400, purge_interval=300):
+        self.store = store
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._ultima_purga = time.monotonic()
+
+    @staticmethod
+    def _firma(app, sid):
+        return hmac.new(app.secret_key.encode('utf-8'), sid.encode('utf-8'), sha256).hexdigest()[:32]
+
+    def _sid_de_cookie(self, app, valor):
+        if not valor or '.' not in valor:
+            return None
+        sid, firma = valor.rsplit('.', 1)
+        return sid if hmac.compare_digest(firma, self._firma(app, sid)) else None
+
+    def open_session(self, app, request):
+        sid = self._sid_de_cookie(app, request.cookies.get(self.get_cookie_name(app)))
+        if sid:
+            try:
+                guardada = self.store.get(sid)
+            except Exception as e:
+                app.logger.warning(f"No se pudo leer la sesión: {e}")
+                guardada = None
+            if guardada is not None:
+                data, expira_at = guardada
+                try:
+                    return ServerSession(self.serializer.loads(data), sid=sid, expira_at=expira_at)
+                except Exception:
+                    pass
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if session.regenerar and not session.new:
+            # Id nuevo al iniciar sesión (evita fijación de sesión)
+            self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.new = True
+        escribir = session.modified or session.new
+        if escribir:
+            session.expira_at = self.store.save(session.sid, self.serializer.dumps(dict(session)), self.ttl)
+        elif session.expira_at is not None and session.expira_at - time.time() < self.ttl / 2:
+            session.expira_at = self.store.touch(session.sid, self.ttl)
+        if session.new or session.regenerar:
+            response.set_cookie(
+                name, f"{session.sid}.{self._firma(app, session.sid)}",
+                expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+                domain=domain, path=path, secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+        self._purgar_si_toca(app)
+
+    def _purgar_si_toca(self, app):
+        if time.monotonic() - self._ultima_purga < self.purge_interval:
+            return
+        self._ultima_purga = time.monotonic()
+        try:
+            borradas = self.store.purge_expired()
+            if borradas:
+                app.logger.info(f"Sesiones vencidas eliminadas: {borradas}")
+        except Exception as e:
+            app.logger.warning(f"No se pudieron purgar las sesiones vencidas: {e}")
+
+
+def regenerar_id(session):
+    """Pide un id de sesión nuevo al guardar (tras el login). Sin efecto con cookies."""
+    if isinstance(session, ServerSession):
+        session.regenerar = True
+
+
+def init_app(app):
+    """Backend de sesión según SESSION_BACKEND: cookie (por defecto), sqlite o redis."""
+    backend = (os.getenv('SESSION_BACKEND') or 'cookie').strip().lower()
+    app.config.setdefault('SESSION_BACKEND', backend if backend in BACKENDS else 'cookie')
+    app.config.setdefault('SESSION_TTL', int(os.getenv('SESSION_TTL', str(7 * 86400))))
+    app.config.setdefault('SESSION_PURGE_INTERVAL', int(os.getenv('SESSION_PURGE_INTERVAL', '300')))
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        return
+    if backend == 'sqlite':
+        app.config.setdefault(
+            'SESSION_SQLITE_PATH',
+            os.getenv('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.sqlite3')
+        )
+        store = SQLiteSessionStore(app.config['SESSION_SQLITE_PATH'])
+    else:
+        app.config.setdefault('SESSION_REDIS_URL', os.getenv('SESSION_REDIS_URL') or os.getenv('REDIS_URL')
+                              or 'redis://localhost:6379/0')
+        store = RedisSessionStore(app.config['SESSION_REDIS_URL'])
+    app.session_interface = ServerSessionInterface(
+        store, ttl=app.config['SESSION_TTL'], purge_interval=app.config['SESSION_PURGE_INTERVAL']
+    )
+    app.extensions['session_store'] = store
@@ -0,0 +1,94 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+
+class StartupProfiler:
+    """Mide las fases del arranque de un worker (imports, config, blueprints, plantillas...).
+
+    Las fases se registran en orden con `fase('nombre')`; `report()` devuelve los
+    tiempos en ms y se expone en /__startup y en el log al terminar el arranque.
+    """
+
+    def __init__(self, inicio=None):
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self.fases = []
+        self._ultimo = self.inicio
+
+    def marcar(self, nombre):
+        """Cierra una fase que empezó donde terminó la anterior."""
+        ahora = time.perf_counter()
+        self.fases.append((nombre, ahora - self._ultimo))
+        self._ultimo = ahora
+
+    @contextmanager
+    def fase(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            ahora = time.perf_counter()
+            self.fases.append((nombre, ahora - inicio))
+            self._ultimo = ahora
+
+    def report(self):
+        return {
+            'pid': os.getpid(),
+            'fases_ms': {nombre: round(segundos * 1000, 2) for nombre, segundos in self.fases},
+            'total_ms': round(sum(segundos for _, segundos in self.fases) * 1000, 2),
+        }
+
+    def log(self, logger, titulo='Arranque'):
+        detalle = ', '.join(f'{nombre} {ms} ms' for nombre, ms in self.report()['fases_ms'].items())
+        logger.info(f"{titulo}: {detalle}")
+
+
+def compilar_plantillas(app):
+    """Compila todas las plantillas en la cache de Jinja (el primer render no paga el parseo)."""
+    total = 0
+    for nombre in app.jinja_env.list_templates():
+        if nombre.endswith('.html'):
+            app.jinja_env.get_template(nombre)
+            total += 1
+    return total
+
+
+def warmup(app, paths=()):
+    """Precalienta un worker: plantillas compiladas e índices/caches en memoria.
+
+    Va a la BD, así que no corre al importar la app: lo llaman `flask warmup`, el
+    hook de gunicorn o `python app.py`. Un índice que falle se carga solo al usarse.
+    `paths` son URLs públicas que se renderizan una vez (cache de catálogo y páginas).
+    """
+    profiler = app.extensions.get('startup_profiler') or StartupProfiler()
+    with profiler.fase('plantillas'):
+        plantillas = compilar_plantillas(app)
+    resumen = {'plantillas': plantillas}
+    with app.app_context():
+        from services.category_index import category_index
+        from services.autocomplete import productos_autocomplete, usuarios_autocomplete
+        from services.search import get_search_backend
+        for nombre, cargar in (
+            ('categorias', category_index.refresh),
+            ('autocomplete_productos', productos_autocomplete.rebuild),
+            ('autocomplete_usuarios', usuarios_autocomplete.rebuild),
+            ('busqueda', lambda: get_search_backend().rebuild()),
+        ):
+            try:
+                with profiler.fase(nombre):
+                    resumen[nombre] = cargar()
+            except Exception as e:
+                app.logger.warning(f"Warmup: no se pudo cargar {nombre}: {e}")
+    if paths:
+        client = app.test_client()
+        with profiler.fase('paginas'):
+            resumen['paginas'] = {path: client.get(path).status_code for path in paths}
+    profiler.log(app.logger, 'Arranque + warmup')
+    return resumen
+
+
+def startup_report():
+    profiler = current_app.extensions.get('startup_profiler')
+    return profiler.report() if profiler else {}
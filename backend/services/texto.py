@@ -0,0 +1,17 @@
+import re
+import unicodedata
+
+_NO_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def fold_text(value) -> str:
+    """Minúsculas y sin tildes: 'Tarjetas Gráficas' -> 'tarjetas graficas'."""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def slugify(value) -> str:
+    """Slug estable para comparar nombres: 'Tarjetas Gráficas' -> 'tarjetas-graficas'."""
+    return _NO_ALNUM.sub('-', fold_text(value)).strip('-')
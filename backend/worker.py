@@ -0,0 +1,16 @@
+"""Worker de tareas en segundo plano de Uparshop.
+
+Ejecutar junto a la app web (mismo disco, comparte la cola SQLite y static/):
+    python worker.py          # procesa tareas indefinidamente
+    python worker.py --once   # vacía la cola y termina
+Con un worker dedicado, configura JOBS_MODE=queue en el proceso web.
+"""
+import sys
+
+from app import app
+from services.jobs import run_worker
+
+if __name__ == "__main__":
+    procesadas = run_worker(app, once='--once' in sys.argv)
+    if procesadas is not None:
+        print(f"✅ Tareas procesadas: {procesadas}")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las rutas principales de Uparshop contra una BD local (SQLite)
+No toca la BD de DigitalOcean: crea una base temporal, la llena a la escala pedida
+y mide cada ruta con el cliente de pruebas de Flask.
+
+Uso (desde la raíz del proyecto):
+    python test/benchmark_rutas.py                          # 2.000 productos, 30 repeticiones
+    python test/benchmark_rutas.py --productos 100000 --repeticiones 50
+    python test/benchmark_rutas.py --sin-cache              # sin cache de páginas ni de catálogo
+    python test/benchmark_rutas.py --comparar test/resultados/benchmark-anterior.json
+
+El reporte JSON (por defecto en test/resultados/) guarda p50/p95/p99, consultas SQL
+y bytes por ruta; con --comparar se marca como regresión toda ruta cuyo p50 empeore
+más que --tolerancia (y al menos --minimo-ms) y el script termina con código 1.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+
+RUTAS_CATEGORIA = [
+    ('Torres', '/torres'), ('Laptops', '/laptops'), ('Procesadores', '/procesadores'),
+    ('Tarjetas Gráficas', '/tarjetas-graficas'), ('Periféricos', '/perifericos'),
+    ('Memorias', '/memorias'), ('Fuentes', '/fuentes'), ('Juegos', '/juegos'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de rutas de Uparshop sobre SQLite local')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--usuarios', type=int, default=500)
+    parser.add_argument('--mensajes', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--db', help='Archivo SQLite (por defecto uno temporal)')
+    parser.add_argument('--salida', help='Ruta del reporte JSON')
+    parser.add_argument('--sin-cache', action='store_true', help='Desactiva la cache de páginas y de catálogo')
+    parser.add_argument('--comparar', help='Reporte JSON anterior para detectar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.20, help='Empeoramiento de p50 aceptado (0.20 = 20%%)')
+    parser.add_argument('--minimo-ms', type=float, default=1.0,
+                        help='Diferencia absoluta mínima de p50 para contar como regresión (ruido en rutas rápidas)')
+    return parser.parse_args()
+
+
+def preparar_entorno(args, workdir):
+    db_path = args.db or os.path.join(workdir, 'benchmark.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOBS_DB_PATH'] = os.path.join(workdir, 'jobs.sqlite3')
+    os.environ['JOBS_MODE'] = 'queue'
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    if args.sin_cache:
+        os.environ['PAGE_CACHE_TTL'] = '0'
+        os.environ['CATALOG_CACHE_TTL'] = '0'
+    sys.path.insert(0, BACKEND)
+    return db_path
+
+
+def rutas(args):
+    q = 'rtx super'
+    producto_id = max(1, args.productos // 2)
+    lista = [('home', 'anon', '/')]
+    lista += [(f'categoria {nombre}', 'anon', url) for nombre, url in RUTAS_CATEGORIA]
+    lista += [
+        ('buscar', 'anon', f'/buscar?q={q}'),
+        ('buscar pagina 2', 'anon', f'/buscar?q={q}&page=2'),
+        ('producto', 'anon', f'/producto/{producto_id}'),
+        ('carrito', 'carrito', '/carrito'),
+        ('carrito cotizar', 'carrito', '/carrito/cotizar'),
+        ('admin productos', 'admin', '/admin/productos'),
+        ('admin productos filtrado', 'admin', '/admin/productos?q=laptop'),
+        ('admin usuarios', 'admin', '/admin/usuarios'),
+        ('admin mensajes', 'admin', '/admin/mensajes'),
+        ('admin mensajes no leídos', 'admin', '/admin/mensajes?estado=noleidos'),
+        ('autocomplete productos', 'admin', '/admin/productos/autocomplete?q=tarj'),
+        ('autocomplete usuarios', 'admin', '/admin/usuarios/autocomplete?q=mar'),
+    ]
+    return lista
+
+
+def clientes(app, args):
+    anon = app.test_client()
+    carrito = app.test_client()
+    rnd = random.Random(args.semilla)
+    with carrito.session_transaction() as s:
+        s['user_email'] = 'seed2@uparshop.test'
+        s['user_id'] = 2
+        s['carrito'] = {str(rnd.randint(1, args.productos)): rnd.randint(1, 3) for _ in range(5)}
+    admin = app.test_client()
+    with admin.session_transaction() as s:
+        s['user_email'] = 'seed1@uparshop.test'
+        s['user_id'] = 1
+        s['user_rol'] = 'admin'
+    return {'anon': anon, 'carrito': carrito, 'admin': admin}
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p
+    f = int(k)
+    c = min(f + 1, len(ordenados) - 1)
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def medir(cliente, url, repeticiones):
+    for _ in range(2):
+        cliente.get(url)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.get(url)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'status': respuesta.status_code,
+        'p50_ms': round(percentil(tiempos, 0.50), 3),
+        'p95_ms': round(percentil(tiempos, 0.95), 3),
+        'p99_ms': round(percentil(tiempos, 0.99), 3),
+        'media_ms': round(statistics.fmean(tiempos), 3),
+        'min_ms': round(min(tiempos), 3),
+        'max_ms': round(max(tiempos), 3),
+        'sql_queries': int(respuesta.headers.get('X-SQL-Queries', -1)),
+        'bytes': len(respuesta.get_data()),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def comparar(actual, anterior_path, tolerancia, minimo_ms):
+    with open(anterior_path, encoding='utf-8') as fh:
+        anterior = json.load(fh)
+    regresiones = []
+    print(f"\n📊 Comparación con {anterior_path} (commit {anterior['meta'].get('commit')})")
+    for nombre, datos in actual['rutas'].items():
+        previo = anterior['rutas'].get(nombre)
+        if not previo or not previo.get('p50_ms'):
+            continue
+        cambio = datos['p50_ms'] / previo['p50_ms'] - 1
+        regresion = cambio > tolerancia and datos['p50_ms'] - previo['p50_ms'] >= minimo_ms
+        marca = '❌' if regresion else '✅'
+        print(f"{marca} {nombre:<32} p50 {previo['p50_ms']:>9.2f} -> {datos['p50_ms']:>9.2f} ms ({cambio:+.0%})")
+        if regresion:
+            regresiones.append(nombre)
+    return regresiones
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='uparshop-bench-')
+    db_path = preparar_entorno(args, workdir)
+
+    print("⏱️  BENCHMARK DE RUTAS UPARSHOP")
+    print("=" * 50)
+    inicio = time.perf_counter()
+    from app import app
+    from models.models import db
+    from services import seeder
+    from services.startup import warmup
+    print(f"✅ App importada en {time.perf_counter() - inicio:.2f} s (BD: {db_path})")
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        db.create_all()
+        seeder.sembrar(db, productos=args.productos, usuarios=args.usuarios,
+                       mensajes=args.mensajes, semilla=args.semilla)
+        print(f"✅ Datos sembrados en {time.perf_counter() - inicio:.2f} s: "
+              f"{args.productos} productos, {args.usuarios} usuarios, {args.mensajes} mensajes")
+    warmup(app)
+
+    resultados = {}
+    por_cliente = clientes(app, args)
+    for nombre, tipo, url in rutas(args):
+        resultados[nombre] = dict(url=url, **medir(por_cliente[tipo], url, args.repeticiones))
+        r = resultados[nombre]
+        print(f"{'✅' if r['status'] < 400 else '❌'} {nombre:<32} p50 {r['p50_ms']:>9.2f} ms  "
+              f"p95 {r['p95_ms']:>9.2f} ms  SQL {r['sql_queries']:>3}  {r['bytes']:>8} B")
+
+    reporte = {
+        'meta': {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'productos': args.productos,
+            'usuarios': args.usuarios,
+            'mensajes': args.mensajes,
+            'repeticiones': args.repeticiones,
+            'semilla': args.semilla,
+            'sin_cache': args.sin_cache,
+        },
+        'rutas': resultados,
+    }
+    salida = args.salida or os.path.join(
+        ROOT, 'test', 'resultados', f"benchmark-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as fh:
+        json.dump(reporte, fh, indent=2, ensure_ascii=False)
+    print(f"\n📝 Reporte: {salida}")
+
+    if args.comparar:
+        regresiones = comparar(reporte, args.comparar, args.tolerancia, args.minimo_ms)
+        if regresiones:
+            print(f"\n❌ Regresiones: {', '.join(regresiones)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()